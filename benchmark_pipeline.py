@@ -0,0 +1,254 @@
+"""Benchmark the extraction, workbook-write and dashboard pipeline on synthetic defect records.
+
+    python benchmark_pipeline.py --scales 100,1000,10000 --output bench_report.json
+
+Each scale generates .docx records (13-column table, Chinese text) and a summary
+workbook, times every stage and writes all results to one JSON report so runs of
+different versions can be compared.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+from defect_processor import DefectProcessor, StatsSidecarCache, read_defect_frame
+
+BENCH_COLUMNS = [
+    "序号", "线别", "发现时间", "设备缺陷地点", "设备缺陷类型", "设备缺陷描述", "发现人",
+    "处理情况", "处理人", "销号时间", "状态", "责任单位", "备注",
+]
+_LINES = ["广州局", "京广线", "广深线", "广茂线", "三茂线"]
+_PLACES = ["广州南站", "佛山西站", "东莞东站", "深圳北站", "肇庆站", "清远站", "韶关站", "江村编组站"]
+_TYPES = ["接触网", "绝缘子", "吊弦", "补偿装置", "支柱基础", "隔离开关", "回流线", "分段绝缘器"]
+_FINDINGS = ["螺栓松动", "表面破损", "锈蚀严重", "断股", "异物悬挂", "线夹偏移", "基础下沉", "绝缘子闪络痕迹"]
+_UNITS = ["广州供电段", "深圳供电段", "肇庆供电段"]
+_PEOPLE = ["张伟", "王芳", "李强", "刘洋", "陈静", "杨帆"]
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def synthetic_record(rng, serial):
+    found = datetime.date(2024, 1, 1) + datetime.timedelta(days=rng.randrange(700))
+    closed = rng.random() < 0.6
+    closed_on = found + datetime.timedelta(days=rng.randrange(1, 60)) if closed else None
+    place = rng.choice(_PLACES)
+    kind = rng.choice(_TYPES)
+    desc = f"{place}{rng.randrange(1, 400)}号支柱{kind}{rng.choice(_FINDINGS)}，需{rng.choice(['尽快', '结合天窗', '下次巡视时'])}处理。"
+    return [
+        str(serial),
+        rng.choice(_LINES),
+        found.strftime("%Y-%m-%d"),
+        place,
+        kind,
+        desc,
+        rng.choice(_PEOPLE),
+        "已更换并紧固" if closed else "",
+        rng.choice(_PEOPLE) if closed else "",
+        closed_on.strftime("%Y-%m-%d") if closed_on else "",
+        "已销号" if closed else "未销号",
+        rng.choice(_UNITS),
+        "",
+    ]
+
+
+def write_defect_docx(path, records):
+    rows = []
+    for cells in [BENCH_COLUMNS] + records:
+        tcs = "".join(f"<w:tc><w:p><w:r><w:t>{escape(str(c))}</w:t></w:r></w:p></w:tc>" for c in cells)
+        rows.append(f"<w:tr>{tcs}</w:tr>")
+    xml = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document xmlns:w="{_W_NS}"><w:body>'
+        f'<w:p><w:r><w:t>设备缺陷处理记录</w:t></w:r></w:p><w:tbl>{"".join(rows)}</w:tbl></w:body></w:document>'
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(
+            "[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            "</Types>",
+        )
+        zf.writestr("word/document.xml", xml)
+
+
+def write_corpus(source_dir, total_rows, rows_per_doc, seed=0):
+    """Write ceil(total_rows / rows_per_doc) .docx files and return their extracted-row equivalents."""
+    rng = random.Random(seed)
+    os.makedirs(source_dir, exist_ok=True)
+    rows = []
+    serial = 1
+    doc_index = 0
+    while serial <= total_rows:
+        records = [synthetic_record(rng, s) for s in range(serial, min(total_rows, serial + rows_per_doc - 1) + 1)]
+        path = os.path.join(source_dir, f"缺陷记录_{doc_index:06d}.docx")
+        write_defect_docx(path, records)
+        rows.extend(r + [path] for r in records)
+        serial += len(records)
+        doc_index += 1
+    return rows
+
+
+def write_summary_workbook(path):
+    import openpyxl
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.cell(row=1, column=1, value="设备缺陷问题库（基准测试）")
+    thin = Side(style="thin")
+    for col, name in enumerate(BENCH_COLUMNS, start=1):
+        cell = ws.cell(row=3, column=col, value=name)
+        cell.font = Font(name="宋体", size=10, bold=True)
+        cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+    wb.save(path)
+
+
+def _timed(timings, name, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    timings[name] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def _make_processor(workers):
+    processor = DefectProcessor(log_callback=lambda *_: None, workers=workers)
+    processor.use_extraction_cache = False
+    processor.write_stats_sidecar = False
+    # Every run starts from scratch and writes nothing next to the program
+    processor.use_job_journal = False
+    return processor
+
+
+def _gui_benchmarks(excel_path, cache_dir, timings, skipped):
+    try:
+        import tkinter as tk
+        import ttkbootstrap as ttk
+        from statistics_panel import StatisticsPanel
+
+        root = ttk.Window(themename="cosmo")
+        root.withdraw()
+    except Exception as e:
+        reason = f"{type(e).__name__}: {e}"
+        for name in ("load_data", "filter_dataframe", "refresh_tree_view"):
+            skipped[name] = reason
+        return
+    try:
+        panel = StatisticsPanel(root, tk.StringVar(value=excel_path), app_instance=None)
+        panel._sidecar = StatsSidecarCache(cache_dir)
+        _timed(timings, "load_data", panel.load_data, force=True, silent=True)
+        panel.year_var.set("2024")
+        panel.status_filter_var.set("未销号")
+        _timed(timings, "filter_dataframe", panel.filter_dataframe, panel.df)
+        panel.search_var.set("螺栓")
+        _timed(timings, "refresh_tree_view", panel.refresh_tree_view)
+    finally:
+        root.destroy()
+
+
+def run_scale(total_rows, rows_per_doc, workers, work_dir):
+    timings = {}
+    skipped = {}
+    source_dir = os.path.join(work_dir, "source")
+    cache_dir = os.path.join(work_dir, "stats_cache")
+
+    rows = _timed(timings, "generate_corpus", write_corpus, source_dir, total_rows, rows_per_doc)
+    docs = len({r[-1] for r in rows})
+
+    # process_source: full native run, then an incremental run with nothing new
+    target = os.path.join(work_dir, "process.xlsx")
+    write_summary_workbook(target)
+    processor = _make_processor(workers)
+    ok = _timed(timings, "process_source", processor.process_source, source_dir, target, False, False)
+    if not ok:
+        skipped["process_source"] = "process_source returned False"
+    _timed(timings, "process_source_incremental_noop", processor.process_source, source_dir, target, False, True)
+
+    # Workbook stages on a standalone file so each measures one operation
+    target = os.path.join(work_dir, "write.xlsx")
+    write_summary_workbook(target)
+    processor = _make_processor(workers)
+    _timed(timings, "write_rows_to_excel", processor._write_rows_to_excel, target, rows, False)
+    doomed = set(sorted({r[-1] for r in rows})[::10])
+    _timed(timings, "remove_rows_by_paths", processor._remove_rows_by_paths, target, doomed)
+    _timed(timings, "normalize_excel_rows", processor._normalize_excel_rows, target)
+
+    df = _timed(timings, "read_defect_frame", read_defect_frame, target)
+    sidecar = StatsSidecarCache(cache_dir)
+    _timed(timings, "sidecar_store", sidecar.store, target, df)
+    _timed(timings, "sidecar_load", sidecar.load, target)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+    _gui_benchmarks(target, cache_dir, timings, skipped)
+
+    return {
+        "rows": total_rows,
+        "docs": docs,
+        "rows_per_doc": rows_per_doc,
+        "removed_docs": len(doomed),
+        "timings": timings,
+        "skipped": skipped,
+    }
+
+
+def _environment():
+    info = {"python": sys.version.split()[0], "platform": platform.platform()}
+    for name in ("pandas", "openpyxl", "numpy", "pyarrow"):
+        try:
+            module = __import__(name)
+            info[name] = getattr(module, "__version__", "")
+        except Exception:
+            info[name] = None
+    return info
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="设备缺陷处理流程性能基准")
+    parser.add_argument("--scales", default="100,1000,10000", help="逗号分隔的记录条数，例如 100,1000,10000,100000")
+    parser.add_argument("--rows-per-doc", type=int, default=10, help="每个Word文档中的记录条数")
+    parser.add_argument("--workers", type=int, default=None, help="并行解析.docx的进程数")
+    parser.add_argument("--output", default="bench_report.json", help="JSON报告输出路径")
+    parser.add_argument("--keep", action="store_true", help="保留生成的测试数据目录")
+    args = parser.parse_args(argv)
+
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    report = {
+        "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": _environment(),
+        "results": [],
+    }
+    for total_rows in scales:
+        work_dir = tempfile.mkdtemp(prefix=f"defect_bench_{total_rows}_")
+        try:
+            print(f"规模 {total_rows} 条记录...", flush=True)
+            result = run_scale(total_rows, max(1, args.rows_per_doc), args.workers, work_dir)
+            report["results"].append(result)
+            for name, seconds in result["timings"].items():
+                print(f"  {name:<34} {seconds:10.3f} s", flush=True)
+            for name, reason in result["skipped"].items():
+                print(f"  {name:<34} 跳过: {reason}", flush=True)
+        finally:
+            if args.keep:
+                print(f"  测试数据保留在: {work_dir}")
+            else:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"报告已写入: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    import multiprocessing
+
+    multiprocessing.freeze_support()
+    sys.exit(main())
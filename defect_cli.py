@@ -0,0 +1,203 @@
+"""Headless batch entry point for DefectProcessor (no Tk, ttkbootstrap or matplotlib).
+
+    python -m auto_fill_defects sync --src <Word目录> --dst <汇总表.xlsx> [--workers N] [--json-progress]
+    python -m auto_fill_defects writeback --dst <汇总表.xlsx> [--dry-run]
+    python -m auto_fill_defects watch --src <Word目录> --dst <汇总表.xlsx>
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import threading
+import time
+
+from defect_processor import DEFAULT_SOURCE_DIR, TARGET_EXCEL_PATH, AutoSyncService, DefectProcessor, ProcessorMetrics
+
+
+class _Reporter:
+    def __init__(self, json_progress=False, stream=None):
+        self.json_progress = json_progress
+        self.stream = stream or sys.stdout
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def elapsed(self):
+        return round(time.perf_counter() - self.started, 3)
+
+    def emit(self, event, **fields):
+        with self._lock:
+            if self.json_progress:
+                record = {"event": event, "elapsed": self.elapsed()}
+                record.update(fields)
+                self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            elif event == "log":
+                self.stream.write(f"{fields.get('message', '')}\n")
+            elif event == "progress":
+                self.stream.write(f"[{fields.get('current')}/{fields.get('total')}] {fields.get('status', '')}\n")
+            elif event == "synced":
+                if fields.get("initial"):
+                    self.stream.write(f"初始同步{'完成' if fields.get('ok') else '失败'}\n")
+                else:
+                    self.stream.write(f"已同步：新增或修改 {len(fields.get('changed') or [])} 个，删除 {len(fields.get('deleted') or [])} 个\n")
+            elif event == "done":
+                state = "完成" if fields.get("ok") else "失败"
+                self.stream.write(f"{state}，用时 {self.elapsed():.1f} 秒\n")
+                metrics = fields.get("metrics") or {}
+                for name, stat in sorted(metrics.get("timings", {}).items()):
+                    self.stream.write(f"  {name:<20} {stat['count']:6d} 次  合计 {stat['total']:8.3f} s  最长 {stat['max']:7.3f} s\n")
+                for name, value in sorted(metrics.get("counters", {}).items()):
+                    self.stream.write(f"  {name:<20} {value}\n")
+            else:
+                self.stream.write(f"{fields.get('title', '')}: {fields.get('message', '')}\n")
+            self.stream.flush()
+
+    def log(self, msg):
+        self.emit("log", message=str(msg))
+
+    def progress(self, current, total, status_msg):
+        self.emit("progress", current=current, total=total, status=status_msg)
+
+    def warning(self, title, message):
+        self.emit("warning", title=title, message=message)
+
+
+# Subcommands that `python -m auto_fill_defects` hands to this module instead of starting the GUI
+COMMANDS = ("sync", "writeback", "watch")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="auto_fill_defects", description="设备缺陷记录批量处理（无界面）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sync = sub.add_parser("sync", help="从Word缺陷记录导入并同步到汇总Excel")
+    sync.add_argument("--src", default=DEFAULT_SOURCE_DIR, help="Word记录所在目录或单个文件")
+    sync.add_argument("--dst", default=TARGET_EXCEL_PATH, help="目标汇总Excel文件")
+    sync.add_argument("--workers", type=int, default=None, help="并行解析.docx的进程数，1为不并行")
+    sync.add_argument("--full", action="store_true", help="全量处理，不跳过已导入的文件")
+    sync.add_argument("--overwrite", action="store_true", help="清空目标表已有数据后写入")
+    sync.add_argument("--no-cache", action="store_true", help="不使用提取结果缓存")
+    sync.add_argument("--no-resume", action="store_true", help="不记录处理进度，中断后从头处理")
+    sync.add_argument("--json-progress", action="store_true", help="以JSON Lines输出日志、进度和耗时")
+    sync.add_argument("--trace", metavar="FILE", default=None, help="将各阶段耗时和事件逐条追加写入该文件（JSON Lines）")
+
+    writeback = sub.add_parser("writeback", help="将汇总Excel中的处理结果反向同步到Word记录")
+    writeback.add_argument("--dst", default=TARGET_EXCEL_PATH, help="汇总Excel文件")
+    writeback.add_argument("--dry-run", action="store_true", help="只列出将要修改的单元格，不写入Word")
+    writeback.add_argument("--full", action="store_true", help="逐个检查所有文档，不跳过上次同步后未变化的文档")
+    writeback.add_argument("--json-progress", action="store_true", help="以JSON Lines输出日志、进度和耗时")
+    writeback.add_argument("--trace", metavar="FILE", default=None, help="将各阶段耗时和事件逐条追加写入该文件（JSON Lines）")
+
+    watch = sub.add_parser("watch", help="持续监视Word目录，文件新增、修改或删除后自动更新汇总Excel")
+    watch.add_argument("--src", default=DEFAULT_SOURCE_DIR, help="Word记录所在目录")
+    watch.add_argument("--dst", default=TARGET_EXCEL_PATH, help="目标汇总Excel文件")
+    watch.add_argument("--batch-delay", type=float, default=3.0, help="文件停止变化多少秒后开始同步")
+    watch.add_argument("--polling", action="store_true", help="不使用系统文件变化通知，定期扫描目录（适用于部分网络共享）")
+    watch.add_argument("--json-progress", action="store_true", help="以JSON Lines输出日志、进度和耗时")
+    return parser
+
+
+def _run_in_background(processor, reporter, fn):
+    result = {}
+
+    def task():
+        try:
+            result["ok"] = fn()
+        except Exception as e:
+            reporter.log(f"处理异常: {e}")
+            result["ok"] = False
+
+    # Processing runs off the main thread so Ctrl+C can request a clean stop
+    worker = threading.Thread(target=task, daemon=True)
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.2)
+    except KeyboardInterrupt:
+        reporter.log("收到中断信号，正在停止...")
+        processor.stop_requested = True
+        worker.join()
+    return bool(result.get("ok"))
+
+
+def run_sync(args, reporter):
+    processor = DefectProcessor(
+        reporter.log,
+        reporter.progress,
+        workers=args.workers,
+        warning_callback=reporter.warning,
+        metrics=ProcessorMetrics(trace_path=args.trace),
+    )
+    processor.use_extraction_cache = not args.no_cache
+    processor.use_job_journal = not args.no_resume
+
+    ok = _run_in_background(
+        processor,
+        reporter,
+        lambda: processor.process_source(args.src, args.dst, overwrite=args.overwrite, incremental=not args.full),
+    )
+    processor.close()
+    processor.metrics.close()
+    reporter.emit("done", ok=ok, src=args.src, dst=args.dst, metrics=processor.metrics.snapshot())
+    return 0 if ok else 1
+
+
+def run_writeback(args, reporter):
+    processor = DefectProcessor(
+        reporter.log,
+        reporter.progress,
+        warning_callback=reporter.warning,
+        metrics=ProcessorMetrics(trace_path=args.trace),
+    )
+    processor.use_writeback_state = not args.full
+    ok = _run_in_background(processor, reporter, lambda: processor.sync_word_from_excel(args.dst, dry_run=args.dry_run))
+    processor.close()
+    processor.metrics.close()
+    plan = [{"file": p["file"], "changes": len(p["changes"])} for p in processor.last_writeback_plan]
+    reporter.emit("done", ok=ok, dst=args.dst, dry_run=args.dry_run, plan=plan, metrics=processor.metrics.snapshot())
+    return 0 if ok else 1
+
+
+def run_watch(args, reporter):
+    processor = DefectProcessor(reporter.log, reporter.progress, warning_callback=reporter.warning)
+
+    def on_synced(changed, deleted, ok):
+        if changed is None:
+            reporter.emit("synced", ok=ok, initial=True)
+        else:
+            reporter.emit("synced", ok=ok, changed=changed, deleted=deleted)
+
+    service = AutoSyncService(
+        processor,
+        args.src,
+        args.dst,
+        on_synced=on_synced,
+        batch_delay=args.batch_delay,
+        backend="polling" if args.polling else None,
+    ).start()
+    reporter.log(f"正在监视: {args.src}（Ctrl+C 退出）")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        reporter.log("收到中断信号，正在停止...")
+    service.stop()
+    processor.close()
+    reporter.emit("done", ok=True, src=args.src, dst=args.dst, metrics=processor.metrics.snapshot())
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    reporter = _Reporter(json_progress=getattr(args, "json_progress", False))
+    if args.command == "sync":
+        return run_sync(args, reporter)
+    if args.command == "writeback":
+        return run_writeback(args, reporter)
+    if args.command == "watch":
+        return run_watch(args, reporter)
+    return 2
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,3241 @@
+import os
+import sys
+import time
+import atexit
+import queue
+import threading
+import tempfile
+import shutil
+import json
+import subprocess
+import zipfile
+import concurrent.futures
+import hashlib
+import re
+import sqlite3
+import xml.etree.ElementTree as ET
+import datetime
+from contextlib import contextmanager
+from copy import copy
+from functools import lru_cache
+
+# Configuration
+def get_base_dir():
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    try:
+        return os.path.dirname(os.path.abspath(__file__))
+    except Exception:
+        return os.getcwd()
+
+BASE_DIR = get_base_dir()
+DEFAULT_SOURCE_DIR = os.path.join(BASE_DIR, "3-设备缺陷问题库及设备缺陷处理记录")
+TARGET_EXCEL_PATH = os.path.join(BASE_DIR, "设备缺陷问题库（日常巡视、故障处理问题库，广供记-002汇总表，202601起）.xlsx")
+
+# Native .docx reading (no Word COM needed)
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_TBL = _W_NS + "tbl"
+_W_TR = _W_NS + "tr"
+_W_TC = _W_NS + "tc"
+_W_T = _W_NS + "t"
+_W_TAB = _W_NS + "tab"
+_W_BR = _W_NS + "br"
+_W_CR = _W_NS + "cr"
+_W_VMERGE = _W_NS + "vMerge"
+_W_VAL = _W_NS + "val"
+_W_TXBX = _W_NS + "txbxContent"
+
+def _clean_cell_text(text):
+    return str(text or "").replace('\r', '').replace('\x07', '').strip()
+
+def _iter_first_table_rows(xml_source):
+    # Streams WordprocessingML and yields the cell texts of each row of the first
+    # top-level table, mirroring what table.Cell(r, c).Range.Text returns via COM.
+    tbl_depth = 0
+    txbx_depth = 0
+    row = None
+    cell = None
+    vmerge_continue = False
+    for event, elem in ET.iterparse(xml_source, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == _W_TBL:
+                tbl_depth += 1
+            elif tag == _W_TXBX:
+                txbx_depth += 1
+            elif tbl_depth == 1 and tag == _W_TR:
+                row = []
+            elif tbl_depth == 1 and tag == _W_TC:
+                cell = []
+                vmerge_continue = False
+            continue
+
+        if tag == _W_TXBX:
+            txbx_depth -= 1
+            continue
+        if tbl_depth == 0:
+            if tag == _W_NS + "p":
+                elem.clear()
+            continue
+
+        if cell is not None and txbx_depth == 0:
+            if tag == _W_T:
+                if elem.text:
+                    cell.append(elem.text)
+            elif tag == _W_TAB:
+                # <w:tab/> inside a run; tab stops under <w:tabs> carry attributes
+                if not elem.attrib:
+                    cell.append("\t")
+            elif tag in (_W_BR, _W_CR):
+                cell.append("\n")
+            elif tag == _W_VMERGE and tbl_depth == 1:
+                val = elem.get(_W_VAL)
+                if val is None or val == "continue":
+                    vmerge_continue = True
+
+        if tbl_depth == 1 and tag == _W_TC:
+            if row is not None and cell is not None:
+                row.append("" if vmerge_continue else "".join(cell))
+            cell = None
+        elif tbl_depth == 1 and tag == _W_TR:
+            if row is not None:
+                yield row
+            row = None
+            elem.clear()
+        elif tag == _W_TBL:
+            tbl_depth -= 1
+            if tbl_depth == 0:
+                return
+
+def read_docx_table_rows(file_path):
+    """Return the raw cell texts of the first table in a .docx, or None if it has no table."""
+    with zipfile.ZipFile(file_path) as zf:
+        with zf.open("word/document.xml") as fh:
+            rows = None
+            for cells in _iter_first_table_rows(fh):
+                if rows is None:
+                    rows = []
+                rows.append([_clean_cell_text(c) for c in cells])
+            return rows
+
+def build_row_data(cells, file_path):
+    row_data = [_clean_cell_text(c) for c in list(cells or [])[:13]]
+    if len(row_data) < 13:
+        row_data.extend([""] * (13 - len(row_data)))
+    if not any(cell.strip() for cell in row_data[1:]):
+        return None
+    row_data.append(file_path)
+    return row_data
+
+_COM_CELL_END = "\r\x07"
+
+def split_com_table_text(text, row_count, col_count):
+    """Split a Word table's Range.Text into row_count rows of col_count raw cell texts.
+
+    Word ends every cell with "\r\x07" and every row with one more "\r\x07". Returns None
+    when the text does not fit that grid (merged cells, nested tables), so the caller can
+    fall back to reading table.Cell(r, c) one by one.
+    """
+    if not text or row_count <= 0 or col_count <= 0:
+        return None
+    parts = text.split(_COM_CELL_END)
+    if parts[-1] == "":
+        parts.pop()
+    width = col_count + 1
+    if len(parts) != row_count * width:
+        return None
+    rows = []
+    for start in range(0, len(parts), width):
+        if parts[start + col_count] != "":
+            return None
+        rows.append(parts[start:start + col_count])
+    return rows
+
+def extract_docx_rows(file_path):
+    """Return (rows, warning) for a .docx; warning is "no_table", "no_rows" or None."""
+    table_rows = read_docx_table_rows(file_path)
+    if table_rows is None:
+        return [], "no_table"
+    if len(table_rows) <= 1:
+        return [], "no_rows"
+    rows = []
+    for cells in table_rows[1:]:
+        row_data = build_row_data(cells, file_path)
+        if row_data is not None:
+            rows.append(row_data)
+    return rows, None
+
+def _extract_docx_worker(file_path):
+    # Runs in a pool process; errors come back as text so the parent can fall back to COM
+    start = time.perf_counter()
+    try:
+        rows, warning = extract_docx_rows(file_path)
+        return rows, warning, None, time.perf_counter() - start
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+def _default_worker_count():
+    return max(1, min(4, (os.cpu_count() or 1) - 1))
+
+def _norm_path_key(path):
+    return os.path.normcase(os.path.normpath(str(path).strip()))
+
+def _extract_cache_path():
+    return os.path.join(get_base_dir(), ".extract_cache.sqlite3")
+
+def _file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class ExtractionCache:
+    """Persistent map of document (path, size, mtime, SHA-1) -> extracted rows."""
+
+    # Bump when the row format changes so stale rows are re-extracted
+    ROWS_VERSION = 1
+
+    def __init__(self, path=None):
+        self.path = path or _extract_cache_path()
+        self.conn = None
+
+    def open(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, timeout=10)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS extract_cache ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha1 TEXT, "
+                "rows_version INTEGER, rows TEXT, updated_at REAL)"
+            )
+            self.conn.commit()
+        return self
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.commit()
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def check(self, file_path):
+        """Return (state, rows, fingerprint) where state is "unchanged", "modified" or "new".
+
+        rows is None when only the fingerprint is known (or the cached rows are stale).
+        """
+        key = _norm_path_key(file_path)
+        st = os.stat(file_path)
+        size, mtime_ns = int(st.st_size), int(st.st_mtime_ns)
+        entry = self.conn.execute(
+            "SELECT size, mtime_ns, sha1, rows_version, rows FROM extract_cache WHERE path = ?", (key,)
+        ).fetchone()
+
+        def cached_rows():
+            if entry[3] != self.ROWS_VERSION or entry[4] is None:
+                return None
+            try:
+                rows = json.loads(entry[4])
+            except Exception:
+                return None
+            # Keep the caller's spelling of the path in column 14
+            return [list(r[:13]) + [file_path] for r in rows]
+
+        if entry is not None and entry[0] == size and entry[1] == mtime_ns:
+            return "unchanged", cached_rows(), (size, mtime_ns, entry[2])
+
+        sha1 = _file_sha1(file_path)
+        if entry is not None and entry[2] == sha1:
+            # Touched or copied but identical content
+            self.conn.execute(
+                "UPDATE extract_cache SET size = ?, mtime_ns = ?, updated_at = ? WHERE path = ?",
+                (size, mtime_ns, time.time(), key),
+            )
+            return "unchanged", cached_rows(), (size, mtime_ns, sha1)
+        return ("modified" if entry is not None else "new"), None, (size, mtime_ns, sha1)
+
+    def put(self, file_path, rows, fingerprint=None):
+        if fingerprint is None:
+            st = os.stat(file_path)
+            fingerprint = (int(st.st_size), int(st.st_mtime_ns), _file_sha1(file_path))
+        size, mtime_ns, sha1 = fingerprint
+        payload = None if rows is None else json.dumps([list(r[:13]) for r in rows], ensure_ascii=False)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO extract_cache (path, size, mtime_ns, sha1, rows_version, rows, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (_norm_path_key(file_path), size, mtime_ns, sha1, self.ROWS_VERSION, payload, time.time()),
+        )
+
+    def remove(self, paths):
+        keys = [(_norm_path_key(p),) for p in paths or []]
+        if keys:
+            self.conn.executemany("DELETE FROM extract_cache WHERE path = ?", keys)
+
+    def commit(self):
+        if self.conn is not None:
+            self.conn.commit()
+
+def _job_journal_path():
+    return os.path.join(get_base_dir(), ".sync_journal.sqlite3")
+
+def _rows_hash(rows):
+    payload = json.dumps([list(r) for r in rows or []], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+class JobJournal:
+    """On-disk record of an import run, so an interrupted run can resume where it stopped.
+
+    Every finished file is recorded with its size/mtime and a hash of its rows. Rows that
+    were extracted but not yet saved to the workbook are kept in the journal; after a
+    checkpoint save they are marked "committed" together with the workbook's signature.
+    A journal whose workbook signature no longer matches the file (edited, restored from
+    an undo backup, ...) is discarded.
+    """
+
+    # Pending records are flushed to disk at least this often (seconds)
+    COMMIT_INTERVAL = 1.0
+
+    def __init__(self, path=None):
+        self.path = path or _job_journal_path()
+        self.conn = None
+        self.job_key = None
+        self._last_commit = time.monotonic()
+
+    def open(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, timeout=10)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS journal_jobs ("
+                "job_key TEXT PRIMARY KEY, started_at REAL, workbook_size INTEGER, workbook_mtime_ns INTEGER)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS journal_files ("
+                "job_key TEXT, path TEXT, status TEXT, size INTEGER, mtime_ns INTEGER, "
+                "row_hash TEXT, rows TEXT, updated_at REAL, PRIMARY KEY (job_key, path))"
+            )
+            self.conn.commit()
+        return self
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.commit()
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    @staticmethod
+    def make_key(source_path, target_excel, overwrite, incremental):
+        return json.dumps(
+            [_norm_path_key(source_path), _norm_path_key(target_excel), bool(overwrite), bool(incremental)]
+        )
+
+    def begin(self, job_key, workbook_signature):
+        """Start or resume job_key; returns (state, entries).
+
+        state is "new", "resumed" or "invalidated". entries maps normalized path ->
+        ("committed", None) or ("extracted", rows) for files whose size and mtime are
+        unchanged since they were recorded.
+        """
+        self.job_key = job_key
+        job = self.conn.execute(
+            "SELECT workbook_size, workbook_mtime_ns FROM journal_jobs WHERE job_key = ?", (job_key,)
+        ).fetchone()
+        if job is not None and workbook_signature is not None and tuple(job) == tuple(workbook_signature):
+            entries = {}
+            for path, status, size, mtime_ns, row_hash, payload in self.conn.execute(
+                "SELECT path, status, size, mtime_ns, row_hash, rows FROM journal_files WHERE job_key = ?", (job_key,)
+            ):
+                if _file_signature(path) != (size, mtime_ns):
+                    continue
+                if status == "committed":
+                    entries[path] = ("committed", None)
+                elif status == "extracted" and payload is not None:
+                    try:
+                        rows = json.loads(payload)
+                    except Exception:
+                        continue
+                    if _rows_hash(rows) == row_hash:
+                        entries[path] = ("extracted", rows)
+            return "resumed", entries
+
+        self._clear(job_key)
+        size, mtime_ns = workbook_signature or (None, None)
+        self.conn.execute(
+            "INSERT INTO journal_jobs (job_key, started_at, workbook_size, workbook_mtime_ns) VALUES (?, ?, ?, ?)",
+            (job_key, time.time(), size, mtime_ns),
+        )
+        self.conn.commit()
+        return ("invalidated" if job is not None else "new"), {}
+
+    def record(self, file_path, status, rows=None):
+        """Record a finished file; status is "extracted" (rows not saved yet) or "failed"."""
+        key = _norm_path_key(file_path)
+        size, mtime_ns = _file_signature(file_path) or (None, None)
+        payload = None if rows is None else json.dumps([list(r) for r in rows], ensure_ascii=False)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO journal_files (job_key, path, status, size, mtime_ns, row_hash, rows, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.job_key, key, status, size, mtime_ns, None if rows is None else _rows_hash(rows), payload, time.time()),
+        )
+        if time.monotonic() - self._last_commit >= self.COMMIT_INTERVAL:
+            self.commit()
+
+    def mark_committed(self, workbook_signature):
+        """Everything recorded as extracted is now in the saved workbook."""
+        size, mtime_ns = workbook_signature or (None, None)
+        self.conn.execute(
+            "UPDATE journal_files SET status = 'committed', rows = NULL, updated_at = ? "
+            "WHERE job_key = ? AND status = 'extracted'",
+            (time.time(), self.job_key),
+        )
+        self.conn.execute(
+            "UPDATE journal_jobs SET workbook_size = ?, workbook_mtime_ns = ? WHERE job_key = ?",
+            (size, mtime_ns, self.job_key),
+        )
+        self.conn.commit()
+
+    def finish(self):
+        self._clear(self.job_key)
+        self.conn.commit()
+
+    def commit(self):
+        if self.conn is not None:
+            self.conn.commit()
+        self._last_commit = time.monotonic()
+
+    def _clear(self, job_key):
+        self.conn.execute("DELETE FROM journal_files WHERE job_key = ?", (job_key,))
+        self.conn.execute("DELETE FROM journal_jobs WHERE job_key = ?", (job_key,))
+
+def _writeback_state_path():
+    return os.path.join(get_base_dir(), ".writeback_state.sqlite3")
+
+class WritebackState:
+    """Per-document record of the last reverse sync that left the Word table in step with Excel.
+
+    Each entry holds a hash of the document's Excel rows (and of the columns used to match
+    and update them) plus the document's size/mtime after the sync. While both still match,
+    the document cannot have anything to write and is skipped without being read.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or _writeback_state_path()
+        self.conn = None
+
+    def open(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, timeout=10)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS writeback_state ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, excel_hash TEXT, updated_at REAL)"
+            )
+            self.conn.commit()
+        return self
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.commit()
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    @staticmethod
+    def excel_hash(rows_data, key_cols, base_cols, update_cols):
+        """Hash of a document's Excel rows; independent of where the rows sit in the sheet."""
+        rows = sorted([format_excel_value(v) for v in values] for _, values, _ in rows_data)
+        payload = json.dumps([list(key_cols), list(base_cols), list(update_cols), rows], ensure_ascii=False)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def is_current(self, file_path, excel_hash):
+        entry = self.conn.execute(
+            "SELECT size, mtime_ns, excel_hash FROM writeback_state WHERE path = ?", (_norm_path_key(file_path),)
+        ).fetchone()
+        if entry is None or entry[2] != excel_hash:
+            return False
+        return _file_signature(file_path) == (entry[0], entry[1])
+
+    def put(self, file_path, excel_hash):
+        sig = _file_signature(file_path)
+        if sig is None:
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO writeback_state (path, size, mtime_ns, excel_hash, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (_norm_path_key(file_path), sig[0], sig[1], excel_hash, time.time()),
+        )
+
+    def remove(self, paths):
+        keys = [(_norm_path_key(p),) for p in paths or []]
+        if keys:
+            self.conn.executemany("DELETE FROM writeback_state WHERE path = ?", keys)
+
+    def commit(self):
+        if self.conn is not None:
+            self.conn.commit()
+
+def _save_workbook_atomic(wb, path):
+    # Save next to the target and swap it in, so readers never see a half-written file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".~", suffix=".xlsx", dir=directory)
+    os.close(fd)
+    try:
+        wb.save(tmp)
+        if os.path.exists(path):
+            # mkstemp creates the file as 0600; keep the permissions the workbook had
+            shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except Exception:
+            pass
+        raise
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+        return (int(st.st_size), int(st.st_mtime_ns))
+    except Exception:
+        return None
+
+class WorkbookSession:
+    """Loads the summary workbook once, applies edits in memory and saves it once.
+
+    Edits are also recorded, so if the file changed on disk while the session was
+    open (e.g. someone saved it in Excel during a long import) they are replayed on
+    a fresh copy instead of overwriting that save.
+    """
+
+    def __init__(self, processor, target_excel):
+        self.processor = processor
+        self.path = target_excel
+        self.wb = None
+        self.ws = None
+        self.dirty = False
+        self._ops = []
+        self._signature = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def open(self):
+        if self.wb is None:
+            self._signature = _file_signature(self.path)
+            self.wb = self.processor._load_workbook(self.path)
+            self.ws = self.wb.active
+        return self
+
+    def close(self):
+        if self.wb is not None:
+            try:
+                self.wb.close()
+            except Exception:
+                pass
+        self.wb = None
+        self.ws = None
+
+    def _apply(self, op):
+        kind = op[0]
+        if kind == "normalize":
+            deleted, changed = self.processor._normalize_rows_ws(self.ws)
+            return deleted, bool(deleted or changed)
+        if kind == "remove":
+            removed = self.processor._remove_rows_by_paths_ws(self.ws, op[1])
+            return removed, bool(removed)
+        if kind == "append":
+            wrote = self.processor._write_rows_ws(self.ws, op[1], overwrite=op[2])
+            return wrote, bool(wrote or op[2])
+        raise ValueError(kind)
+
+    def _run(self, op):
+        result, changed = self._apply(op)
+        if changed:
+            self._ops.append(op)
+            self.dirty = True
+        return result
+
+    def processed_paths(self):
+        return self.processor._processed_paths_ws(self.ws)
+
+    def normalize(self):
+        return self._run(("normalize",))
+
+    def remove_paths(self, paths):
+        if not paths:
+            return 0
+        return self._run(("remove", set(paths)))
+
+    def append_rows(self, rows, overwrite=False):
+        return self._run(("append", list(rows), overwrite))
+
+    def commit(self):
+        if not self.dirty:
+            return False
+        if _file_signature(self.path) != self._signature:
+            ops = self._ops
+            self.close()
+            self._ops = []
+            self.open()
+            self.processor.log("提示: 目标Excel在处理期间已被修改，正在基于最新文件重新应用更改...")
+            for op in ops:
+                self._apply(op)
+            self._ops = ops
+        self.processor._hide_path_column_ws(self.ws)
+        self.processor._save_workbook(self.wb, self.path)
+        self._signature = _file_signature(self.path)
+        self._ops = []
+        self.dirty = False
+        return True
+
+# Dashboard data loading
+STATS_CATEGORY_COLUMNS = ("设备缺陷类型", "设备缺陷地点")
+
+def _date_candidate_columns(df):
+    if df is None or df.empty or not hasattr(df, "columns"):
+        return []
+    cols = []
+    for c in df.columns:
+        if c == "销号时间":
+            continue
+        s = str(c)
+        if "时间" in s or "日期" in s:
+            cols.append(c)
+    return cols
+
+def _parse_datetime_series(series):
+    import pandas as pd
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    try:
+        return pd.to_datetime(series, errors="coerce", format="mixed")
+    except TypeError:
+        pass
+    try:
+        dt = pd.to_datetime(series, errors="coerce")
+    except Exception:
+        try:
+            dt = pd.to_datetime(series.astype(str), errors="coerce")
+        except Exception:
+            return pd.Series([pd.NaT] * len(series), index=series.index)
+    try:
+        if dt.notna().all():
+            return dt
+    except Exception:
+        return dt
+
+    try:
+        s = series.astype(str)
+    except Exception:
+        return dt
+
+    try:
+        s = s.str.strip()
+        s = s.str.replace("年", "-", regex=False)
+        s = s.str.replace("月", "-", regex=False)
+        s = s.str.replace("日", "", regex=False)
+        s = s.str.replace(".", "-", regex=False)
+        s = s.str.replace("/", "-", regex=False)
+        s = s.str.replace(r"\s+", " ", regex=True).str.strip()
+        dt2 = pd.to_datetime(s, errors="coerce")
+        return dt.where(dt.notna(), dt2)
+    except Exception:
+        return dt
+
+def read_defect_frame(path):
+    """Read the summary workbook into the typed DataFrame the dashboard works on."""
+    import pandas as pd
+    df = pd.read_excel(path, header=2)
+    required_cols = ['设备缺陷类型', '销号时间', '设备缺陷地点']
+    if not all(col in df.columns for col in required_cols):
+        df = pd.read_excel(path)
+
+    filter_cols = ['设备缺陷地点', '设备缺陷类型', '设备缺陷描述']
+    valid_cols = [c for c in filter_cols if c in df.columns]
+    if valid_cols:
+        df = df.dropna(subset=valid_cols, how='all')
+
+    # Store dates and low-cardinality text already typed so readers skip re-parsing
+    if "销号时间" in df.columns:
+        df["销号时间"] = _parse_datetime_series(df["销号时间"])
+    for c in _date_candidate_columns(df):
+        parsed = _parse_datetime_series(df[c])
+        if int(parsed.notna().sum()) >= int(df[c].notna().sum()):
+            df[c] = parsed
+    for c in STATS_CATEGORY_COLUMNS:
+        if c in df.columns:
+            try:
+                df[c] = df[c].astype("category")
+            except Exception:
+                pass
+    return df
+
+def _stats_cache_dir():
+    return os.path.join(get_base_dir(), ".stats_cache")
+
+class StatsSidecarCache:
+    """Columnar copy of read_defect_frame(path), keyed on the workbook's path, size and mtime.
+
+    Uses Feather when pyarrow is installed and falls back to pickle otherwise.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or _stats_cache_dir()
+
+    def _paths(self, excel_path):
+        key = hashlib.sha1(_norm_path_key(excel_path).encode("utf-8")).hexdigest()[:20]
+        base = os.path.join(self.cache_dir, key)
+        return base + ".json", base
+
+    def _expected_meta(self, excel_path, signature):
+        import pandas as pd
+        return {
+            "path": _norm_path_key(excel_path),
+            "signature": list(signature),
+            "version": self.FORMAT_VERSION,
+            "pandas": pd.__version__,
+        }
+
+    def load(self, excel_path):
+        import pandas as pd
+        signature = _file_signature(excel_path)
+        if signature is None:
+            return None
+        meta_path, base = self._paths(excel_path)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            fmt = meta.pop("format", None)
+            if meta != self._expected_meta(excel_path, signature):
+                return None
+            if fmt == "feather":
+                df = pd.read_feather(base + ".feather")
+                return df.set_index("__index__").rename_axis(None)
+            if fmt == "pickle":
+                return pd.read_pickle(base + ".pkl")
+        except Exception:
+            return None
+        return None
+
+    def store(self, excel_path, df, signature=None):
+        signature = signature or _file_signature(excel_path)
+        if signature is None or df is None:
+            return False
+        meta_path, base = self._paths(excel_path)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fmt = None
+            try:
+                import pyarrow  # noqa: F401
+                tmp = base + ".feather.tmp"
+                df.reset_index(names="__index__").to_feather(tmp)
+                os.replace(tmp, base + ".feather")
+                fmt = "feather"
+            except Exception:
+                tmp = base + ".pkl.tmp"
+                df.to_pickle(tmp)
+                os.replace(tmp, base + ".pkl")
+                fmt = "pickle"
+            meta = self._expected_meta(excel_path, signature)
+            meta["format"] = fmt
+            tmp = meta_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(tmp, meta_path)
+            return True
+        except Exception:
+            return False
+
+class ProcessorMetrics:
+    """Counters and per-stage timings collected while DefectProcessor runs.
+
+    When trace_path is set every timing and event is also appended to that
+    file as one JSON object per line.
+    """
+
+    def __init__(self, trace_path=None):
+        self.trace_path = trace_path
+        self._lock = threading.Lock()
+        self._trace = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.timings = {}
+
+    def _write_trace(self, record):
+        if not self.trace_path:
+            return
+        try:
+            if self._trace is None:
+                self._trace = open(self.trace_path, "a", encoding="utf-8")
+            self._trace.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            self._trace.flush()
+        except Exception:
+            pass
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def event(self, name, **fields):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+            self._write_trace(dict(fields, ts=time.time(), kind="event", name=name))
+
+    def add_time(self, stage, seconds, **fields):
+        with self._lock:
+            stat = self.timings.get(stage)
+            if stat is None:
+                stat = self.timings[stage] = {"count": 0, "total": 0.0, "max": 0.0}
+            stat["count"] += 1
+            stat["total"] += seconds
+            stat["max"] = max(stat["max"], seconds)
+            self._write_trace(dict(fields, ts=time.time(), kind="timing", name=stage, seconds=round(seconds, 6)))
+
+    @contextmanager
+    def timed(self, stage, **fields):
+        """Time the with-block; fields added to the yielded dict go into the trace record."""
+        start = time.perf_counter()
+        try:
+            yield fields
+        except Exception as e:
+            fields["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.add_time(stage, time.perf_counter() - start, **fields)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "timings": {
+                    k: {"count": v["count"], "total": round(v["total"], 6), "max": round(v["max"], 6)}
+                    for k, v in self.timings.items()
+                },
+            }
+
+    def close(self):
+        with self._lock:
+            if self._trace is not None:
+                try:
+                    self._trace.close()
+                except Exception:
+                    pass
+                self._trace = None
+
+# Excel -> Word row matching for sync_word_from_excel
+_DATE_LIKE_RE = re.compile(r"^\d[\d\s./:\-T]*$")
+_ISO_DATE_RE = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})(?: 00:00:00)?$")
+
+def clean_word_text(s):
+    try:
+        s = "" if s is None else str(s)
+    except Exception:
+        return ""
+    return s.replace("\r", "").replace("\x07", "").strip()
+
+@lru_cache(maxsize=65536)
+def _normalize_key_text(s):
+    # Only strings made of digits and date/time separators can parse as a date here;
+    # everything else (locations, descriptions, names) is returned without calling pandas
+    if not s or not _DATE_LIKE_RE.match(s):
+        return s
+    m = _ISO_DATE_RE.match(s)
+    if m:
+        try:
+            d = datetime.date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        except ValueError:
+            return s
+        return d.strftime("%Y-%m-%d") if 2000 <= d.year <= 2100 else s
+    import pandas as pd
+    try:
+        ts = pd.to_datetime(s, errors="coerce")
+        if pd.notna(ts) and 2000 <= int(ts.year) <= 2100:
+            if int(ts.hour) == 0 and int(ts.minute) == 0 and int(ts.second) == 0:
+                return ts.strftime("%Y-%m-%d")
+            return ts.strftime("%Y-%m-%d %H:%M:%S")
+    except Exception:
+        pass
+    return s
+
+def norm_key_part(v):
+    """Comparable form of a cell value: whitespace collapsed, dates as YYYY-MM-DD[ HH:MM:SS]."""
+    return _normalize_key_text(" ".join(clean_word_text(v).split()))
+
+def _max_weight_assignment(weights):
+    """Optimal assignment on a rectangular matrix of non-negative int weights (0 = no edge).
+
+    Returns (total, pairs) where pairs are (row, col) with a positive weight.
+    """
+    n = len(weights)
+    m = len(weights[0]) if n else 0
+    if not n or not m:
+        return 0, []
+    transposed = n > m
+    if transposed:
+        weights = [list(col) for col in zip(*weights)]
+        n, m = m, n
+    # Hungarian algorithm (potentials, O(n^2 m)) minimizing -weight
+    inf = float("inf")
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row = weights[i0 - 1]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = -row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if j0 == 0:
+                break
+    pairs = []
+    total = 0
+    for j in range(1, m + 1):
+        i = p[j]
+        if i and weights[i - 1][j - 1] > 0:
+            total += weights[i - 1][j - 1]
+            pairs.append((j - 1, i - 1) if transposed else (i - 1, j - 1))
+    return total, sorted(pairs)
+
+class RowMatcher:
+    """Pairs Excel rows with the rows of one Word table.
+
+    Rows are lists of already normalized cell values. A pair is either "exact" (same
+    primary key and base-column signature; identical groups pair up in table order) or
+    "scored" by the number of base columns with equal non-empty values. Scored
+    candidates come from per-column value indexes and need at least min_same_key
+    (same primary key) or min_other equal columns. Each connected group of candidates
+    is solved as an optimal assignment, and a pair is kept only if it is part of every
+    optimal assignment; anything else is reported "ambiguous".
+    """
+
+    # Larger candidate groups use mutual-best matching instead of the assignment solver
+    ASSIGNMENT_LIMIT = 25
+
+    def __init__(self, key_cols, base_cols):
+        self.key_cols = list(key_cols)
+        self.base_cols = list(base_cols)
+        self.min_same_key = max(2, len(self.base_cols) // 3)
+        self.min_other = max(3, len(self.base_cols) // 2)
+        # Same-key pairs always outrank pairs across keys
+        self.same_key_bonus = len(self.base_cols) + 1
+
+    def row_keys(self, norm):
+        """(primary key, signature) of a normalized row; empty strings when unusable."""
+        primary = "||".join(norm[i] for i in self.key_cols if norm[i])
+        sig = "||".join(norm[i] for i in self.base_cols if norm[i])
+        return primary, sig
+
+    def match(self, excel_rows, word_rows):
+        """Returns one (word_index or None, mode) per Excel row; mode is "exact",
+        "scored", "ambiguous" or "unmatched"."""
+        result = [(None, "unmatched")] * len(excel_rows)
+        excel_keys = [self.row_keys(r) for r in excel_rows]
+        word_keys = [self.row_keys(r) for r in word_rows]
+
+        # 1. Exact pairs
+        groups = {}
+        for e, keys in enumerate(excel_keys):
+            if keys[0] and keys[1]:
+                groups.setdefault(keys, ([], []))[0].append(e)
+        for w, keys in enumerate(word_keys):
+            if keys in groups:
+                groups[keys][1].append(w)
+        excel_left = set(e for e, keys in enumerate(excel_keys) if keys[0] and keys[1])
+        word_left = set(w for w, keys in enumerate(word_keys) if keys[0])
+        for es, ws in groups.values():
+            if not ws:
+                continue
+            if len(es) == len(ws):
+                for e, w in zip(es, ws):
+                    result[e] = (w, "exact")
+            else:
+                for e in es:
+                    result[e] = (None, "ambiguous")
+            excel_left.difference_update(es)
+            word_left.difference_update(ws)
+
+        # 2. Scored candidates through per-column value indexes
+        index = {c: {} for c in self.base_cols}
+        by_primary = {}
+        for w in sorted(word_left):
+            row = word_rows[w]
+            for c in self.base_cols:
+                if row[c]:
+                    index[c].setdefault(row[c], []).append(w)
+            by_primary.setdefault(word_keys[w][0], []).append(w)
+
+        edges = {}
+        for e in sorted(excel_left):
+            row = excel_rows[e]
+            primary = excel_keys[e][0]
+            candidates = set(by_primary.get(primary, ()))
+            # A row sharing min_other values with this one shares at least one of the
+            # rarest len(postings) - min_other + 1 of them
+            postings = sorted((index[c].get(row[c], ()) for c in self.base_cols if row[c]), key=len)
+            for posting in postings[:max(0, len(postings) - self.min_other + 1)]:
+                candidates.update(posting)
+            for w in candidates:
+                other = word_rows[w]
+                score = sum(1 for c in self.base_cols if row[c] and row[c] == other[c])
+                same_key = word_keys[w][0] == primary
+                if score >= (self.min_same_key if same_key else self.min_other):
+                    edges[(e, w)] = score + (self.same_key_bonus if same_key else 0)
+            if primary in by_primary and result[e][1] == "unmatched":
+                result[e] = (None, "ambiguous")
+
+        for excel_group, word_group in self._components(edges):
+            for e, w in self._solve(excel_group, word_group, edges):
+                result[e] = (w, "scored")
+            for e in excel_group:
+                if result[e][0] is None:
+                    result[e] = (None, "ambiguous")
+        return result
+
+    def _components(self, edges):
+        parent = {}
+
+        def find(x):
+            while parent.setdefault(x, x) != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for e, w in edges:
+            a, b = find(("e", e)), find(("w", w))
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+        groups = {}
+        for e, w in edges:
+            group = groups.setdefault(find(("e", e)), (set(), set()))
+            group[0].add(e)
+            group[1].add(w)
+        return [(sorted(es), sorted(ws)) for es, ws in groups.values()]
+
+    def _solve(self, excel_group, word_group, edges):
+        if len(excel_group) > self.ASSIGNMENT_LIMIT or len(word_group) > self.ASSIGNMENT_LIMIT:
+            return self._mutual_best(excel_group, word_group, edges)
+        weights = [[edges.get((e, w), 0) for w in word_group] for e in excel_group]
+        total, pairs = _max_weight_assignment(weights)
+        unique = []
+        for i, j in pairs:
+            # Kept only if every optimal assignment uses this pair
+            saved = weights[i][j]
+            weights[i][j] = 0
+            alternative, _ = _max_weight_assignment(weights)
+            weights[i][j] = saved
+            if alternative < total:
+                unique.append((excel_group[i], word_group[j]))
+        return unique
+
+    def _mutual_best(self, excel_group, word_group, edges):
+        best_e = {}
+        best_w = {}
+        for (e, w), weight in edges.items():
+            for best, key in ((best_e, e), (best_w, w)):
+                current = best.get(key)
+                if current is None or weight > current[0]:
+                    best[key] = (weight, 1)
+                elif weight == current[0]:
+                    best[key] = (weight, current[1] + 1)
+        pairs = []
+        members = set(excel_group)
+        for (e, w), weight in sorted(edges.items()):
+            if e in members and best_e[e] == (weight, 1) and best_w[w] == (weight, 1):
+                pairs.append((e, w))
+        return pairs
+
+def format_excel_value(v):
+    """Text written into a Word cell for an Excel value (midnight datetimes as dates)."""
+    if v is None:
+        return ""
+    try:
+        if isinstance(v, datetime.datetime):
+            if v.hour == 0 and v.minute == 0 and v.second == 0:
+                return v.strftime("%Y-%m-%d")
+            return v.strftime("%Y-%m-%d %H:%M:%S")
+        if isinstance(v, datetime.date):
+            return v.strftime("%Y-%m-%d")
+    except Exception:
+        pass
+    try:
+        s = str(v)
+    except Exception:
+        return ""
+    s = s.strip()
+    return "" if s == "None" else s
+
+def plan_writeback(excel_rows, word_norm, matcher, update_cols):
+    """Diff one Word table against its Excel rows without touching Word.
+
+    excel_rows are (excel_row_idx, values, norm) tuples and word_norm the normalized data rows
+    of the table (header row excluded). Returns (changes, counts): changes are
+    (table_row, column, old, new) in 1-based Word table coordinates, counts holds the number of
+    "matched", "ambiguous" and "unmatched" Excel rows.
+    """
+    ordered = sorted(excel_rows, key=lambda x: x[0])
+    matches = matcher.match([norm for _, _, norm in ordered], word_norm)
+    changes = []
+    counts = {"matched": 0, "ambiguous": 0, "unmatched": 0}
+    for (_, values, _), (word_index, mode) in zip(ordered, matches):
+        if word_index is None:
+            counts["ambiguous" if mode == "ambiguous" else "unmatched"] += 1
+            continue
+        counts["matched"] += 1
+        word_vals = word_norm[word_index]
+        for col0 in update_cols:
+            new_v = format_excel_value(values[col0])
+            if new_v != word_vals[col0]:
+                # Word data rows start below the header row
+                changes.append((word_index + 2, col0 + 1, word_vals[col0], new_v))
+    return changes, counts
+
+# Word / WPS automation
+RPC_E_SERVER_UNAVAILABLE = -2147023174
+
+def _is_rpc_unavailable(err):
+    try:
+        args = getattr(err, "args", None)
+        if args and len(args) >= 1 and int(args[0]) == RPC_E_SERVER_UNAVAILABLE:
+            return True
+    except Exception:
+        pass
+    return False
+
+def _kill_word_processes():
+    try:
+        subprocess.run(
+            ["taskkill", "/F", "/IM", "WINWORD.EXE"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        )
+    except Exception:
+        pass
+
+def dispatch_word_app(dispatch):
+    """Start (or attach to) Word through dispatch, falling back to WPS; raises Word's error."""
+    try:
+        return dispatch("Word.Application")
+    except Exception as e:
+        for progid in ("Kwps.Application", "Wps.Application"):
+            try:
+                return dispatch(progid)
+            except Exception:
+                pass
+        raise e
+
+def _create_hidden_word_app():
+    import win32com.client
+    app = dispatch_word_app(win32com.client.DispatchEx)
+    try:
+        app.Visible = False
+    except Exception:
+        pass
+    try:
+        app.DisplayAlerts = 0
+    except Exception:
+        pass
+    try:
+        app.AutomationSecurity = 3
+    except Exception:
+        pass
+    # A freshly started instance is not always ready for Documents.Open straight away
+    time.sleep(0.8)
+    return app
+
+class WordAppPool:
+    """Warm, hidden Word/WPS instances shared by every COM code path of DefectProcessor.
+
+    COM objects belong to the thread that created them, so callers never hold an
+    instance: submit(fn) runs fn(word) on one of the pool's owner threads and returns
+    a Future. Each owner checks its instance is alive before every job, replaces it
+    after max_docs documents or an RPC failure, and quits it after idle_timeout seconds
+    without work. factory() creates an instance and can be replaced for testing.
+    """
+
+    def __init__(self, factory=None, size=1, max_docs=200, idle_timeout=300, metrics=None, log_callback=None):
+        self.factory = factory or _create_hidden_word_app
+        self.size = max(1, int(size))
+        self.max_docs = max_docs
+        self.idle_timeout = idle_timeout
+        self.metrics = metrics or ProcessorMetrics()
+        self.log = log_callback or (lambda *_: None)
+        self._jobs = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._closed = False
+
+    def submit(self, fn, fresh=False):
+        """Run fn(word) on an owner thread; fresh=True uses a new instance that is quit afterwards."""
+        future = concurrent.futures.Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("WordAppPool is closed")
+            if len(self._threads) < self.size:
+                t = threading.Thread(target=self._run_owner, name=f"word-pool-{len(self._threads) + 1}", daemon=True)
+                self._threads.append(t)
+                t.start()
+                if len(self._threads) == 1:
+                    atexit.register(self.close)
+            self._jobs.put((fn, future, fresh))
+        return future
+
+    def call(self, fn, fresh=False):
+        return self.submit(fn, fresh=fresh).result()
+
+    def recycle(self, kill=False):
+        """Replace every instance before its next job; kill=True also ends all WINWORD.EXE processes."""
+        with self._lock:
+            self._generation += 1
+        if kill:
+            _kill_word_processes()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = list(self._threads)
+            for _ in threads:
+                self._jobs.put(None)
+        for t in threads:
+            if t is not threading.current_thread():
+                t.join(timeout=30)
+
+    def _is_alive(self, app):
+        if app is None:
+            return False
+        try:
+            _ = app.Version
+            return True
+        except Exception:
+            return False
+
+    def _start(self):
+        self.metrics.count("word.start")
+        return self.factory()
+
+    def _quit(self, app):
+        if app is None:
+            return
+        try:
+            app.Quit()
+        except Exception:
+            pass
+
+    def _run_owner(self):
+        try:
+            import pythoncom
+            pythoncom.CoInitialize()
+        except Exception:
+            pythoncom = None
+
+        app = None
+        used = 0
+        generation = self._generation
+        try:
+            while True:
+                try:
+                    job = self._jobs.get(timeout=self.idle_timeout if app is not None else None)
+                except queue.Empty:
+                    self._quit(app)
+                    app = None
+                    continue
+                if job is None:
+                    break
+                fn, future, fresh = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                if fresh:
+                    temp_app = None
+                    try:
+                        temp_app = self._start()
+                        future.set_result(fn(temp_app))
+                    except BaseException as e:
+                        future.set_exception(e)
+                    finally:
+                        self._quit(temp_app)
+                    continue
+
+                try:
+                    if app is not None and (
+                        generation != self._generation
+                        or (self.max_docs and used >= self.max_docs)
+                        or not self._is_alive(app)
+                    ):
+                        self.metrics.event("word.recycle", documents=used)
+                        self._quit(app)
+                        app = None
+                    if app is None:
+                        generation = self._generation
+                        app = self._start()
+                        used = 0
+                    used += 1
+                    result = fn(app)
+                except BaseException as e:
+                    future.set_exception(e)
+                    if _is_rpc_unavailable(e) or not self._is_alive(app):
+                        self._quit(app)
+                        app = None
+                else:
+                    future.set_result(result)
+        finally:
+            self._quit(app)
+            if pythoncom is not None:
+                try:
+                    pythoncom.CoUninitialize()
+                except Exception:
+                    pass
+
+# Source directory watching
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+
+class SourceWatcher:
+    """Watches a directory tree and reports Word documents that were added, changed or deleted.
+
+    A reader thread turns OS notifications (inotify on Linux, ReadDirectoryChangesW on
+    Windows, a periodic scan elsewhere or when those fail) into touched paths. A dispatcher
+    thread waits until a path has been quiet for `debounce` seconds, so the burst of writes
+    and renames of one save is reported once, compares it with the in-memory index
+    (path -> size, mtime_ns) and calls on_changes(changed, deleted) with the real changes.
+    If on_changes returns False the paths are retried after RETRY_DELAY seconds.
+    """
+
+    POLL_INTERVAL = 2.0
+    RETRY_DELAY = 5.0
+
+    def __init__(self, root, on_changes, debounce=2.0, extensions=(".doc", ".docx"), log_callback=None, backend=None):
+        self.root = os.path.normpath(root)
+        self.on_changes = on_changes
+        self.debounce = debounce
+        self.extensions = tuple(e.lower() for e in extensions)
+        self.log = log_callback or (lambda *_: None)
+        # None picks the platform's notification API; "polling" forces periodic scans
+        self.backend = backend
+        self.index = {}
+        self._pending = {}
+        self._rescan = False
+        self._cond = threading.Condition()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return self
+        if self.backend is None:
+            if os.name == "nt":
+                self.backend = "windows"
+            elif sys.platform.startswith("linux"):
+                self.backend = "inotify"
+            else:
+                self.backend = "polling"
+        for target, name in ((self._run_reader, "SourceWatcher"), (self._run_dispatcher, "SourceWatcherDispatch")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._ready.set()
+        with self._cond:
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=2)
+        self._threads = []
+
+    def wait_ready(self, timeout=None):
+        """Block until the initial scan has built the index."""
+        return self._ready.wait(timeout)
+
+    def _wanted(self, name):
+        name = name.lower()
+        return name.endswith(self.extensions) and not name.startswith("~$")
+
+    def _scan(self, top, on_dir=None):
+        found = {}
+        stack = [top]
+        while stack and not self._stop.is_set():
+            d = stack.pop()
+            if on_dir is not None:
+                on_dir(d)
+            try:
+                it = os.scandir(d)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif self._wanted(entry.name):
+                            st = entry.stat()
+                            found[os.path.normpath(entry.path)] = (int(st.st_size), int(st.st_mtime_ns))
+                    except OSError:
+                        pass
+        return found
+
+    def _touch(self, path, delay=0.0):
+        with self._cond:
+            self._pending[os.path.normpath(path)] = time.monotonic() + delay
+            self._cond.notify()
+
+    def _request_rescan(self):
+        with self._cond:
+            self._rescan = True
+            self._cond.notify()
+
+    def _run_reader(self):
+        runners = {"inotify": self._watch_inotify, "windows": self._watch_windows}
+        runner = runners.get(self.backend)
+        if runner is not None:
+            try:
+                runner()
+                return
+            except Exception as e:
+                if self._stop.is_set():
+                    return
+                self.log(f"提示: 文件变化通知不可用（{type(e).__name__}: {e}），改为每 {self.POLL_INTERVAL:g} 秒检查一次。")
+                self.backend = "polling"
+                if self._ready.is_set():
+                    self._request_rescan()
+        self._watch_polling()
+
+    def _watch_polling(self):
+        if not self._ready.is_set():
+            self.index = self._scan(self.root)
+            self._ready.set()
+        seen = dict(self.index)
+        while not self._stop.wait(self.POLL_INTERVAL):
+            current = self._scan(self.root)
+            for path in set(seen) | set(current):
+                if seen.get(path) != current.get(path):
+                    self._touch(path)
+            seen = current
+
+    def _watch_inotify(self):
+        import ctypes
+        import ctypes.util
+        import select
+        import struct
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | getattr(os, "O_CLOEXEC", 0))
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        mask = _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_ONLYDIR
+        watches = {}
+
+        def add_watch(d):
+            wd = libc.inotify_add_watch(fd, os.fsencode(d), mask)
+            if wd >= 0:
+                watches[wd] = d
+            elif ctypes.get_errno() == 28:
+                # ENOSPC: fs.inotify.max_user_watches is too low for this tree
+                raise OSError(28, "inotify watch limit reached")
+
+        try:
+            self.index = self._scan(self.root, on_dir=add_watch)
+            self._ready.set()
+            while not self._stop.is_set():
+                readable, _, _ = select.select([fd], [], [], 0.5)
+                if not readable:
+                    continue
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                pos = 0
+                while pos + 16 <= len(data):
+                    wd, event, _, length = struct.unpack_from("iIII", data, pos)
+                    name = os.fsdecode(data[pos + 16:pos + 16 + length].split(b"\0", 1)[0])
+                    pos += 16 + length
+                    if event & _IN_Q_OVERFLOW:
+                        self._request_rescan()
+                        continue
+                    if event & _IN_IGNORED:
+                        watches.pop(wd, None)
+                        continue
+                    base = watches.get(wd)
+                    if base is None or not name:
+                        continue
+                    path = os.path.join(base, name)
+                    if event & _IN_ISDIR:
+                        if event & (_IN_CREATE | _IN_MOVED_TO):
+                            self._scan(path, on_dir=add_watch)
+                        self._touch(path)
+                    elif self._wanted(name):
+                        self._touch(path)
+        finally:
+            os.close(fd)
+
+    def _watch_windows(self):
+        import pywintypes
+        import win32con
+        import win32event
+        import win32file
+
+        handle = win32file.CreateFile(
+            self.root,
+            0x0001,  # FILE_LIST_DIRECTORY
+            win32con.FILE_SHARE_READ | win32con.FILE_SHARE_WRITE | win32con.FILE_SHARE_DELETE,
+            None,
+            win32con.OPEN_EXISTING,
+            win32con.FILE_FLAG_BACKUP_SEMANTICS | win32con.FILE_FLAG_OVERLAPPED,
+            None,
+        )
+        flags = (
+            win32con.FILE_NOTIFY_CHANGE_FILE_NAME
+            | win32con.FILE_NOTIFY_CHANGE_DIR_NAME
+            | win32con.FILE_NOTIFY_CHANGE_SIZE
+            | win32con.FILE_NOTIFY_CHANGE_LAST_WRITE
+        )
+        overlapped = pywintypes.OVERLAPPED()
+        overlapped.hEvent = win32event.CreateEvent(None, True, False, None)
+        buf = win32file.AllocateReadBuffer(64 * 1024)
+        try:
+            # Changes are buffered from the first call on, so nothing is lost during the scan
+            win32file.ReadDirectoryChangesW(handle, buf, True, flags, overlapped)
+            self.index = self._scan(self.root)
+            self._ready.set()
+            while not self._stop.is_set():
+                if win32event.WaitForSingleObject(overlapped.hEvent, 500) != win32event.WAIT_OBJECT_0:
+                    continue
+                n = win32file.GetOverlappedResult(handle, overlapped, True)
+                if n == 0:
+                    # The notification buffer overflowed
+                    self._request_rescan()
+                else:
+                    for _, name in win32file.FILE_NOTIFY_INFORMATION(buf, n):
+                        self._touch(os.path.join(self.root, name))
+                win32event.ResetEvent(overlapped.hEvent)
+                win32file.ReadDirectoryChangesW(handle, buf, True, flags, overlapped)
+        finally:
+            try:
+                win32file.CancelIo(handle)
+            except Exception:
+                pass
+            handle.Close()
+
+    def _run_dispatcher(self):
+        self._ready.wait()
+        while not self._stop.is_set():
+            with self._cond:
+                now = time.monotonic()
+                due = [p for p, t in self._pending.items() if now - t >= self.debounce]
+                rescan = self._rescan
+                if not due and not rescan:
+                    waits = [self.debounce - (now - t) for t in self._pending.values()]
+                    self._cond.wait(max(0.05, min(waits)) if waits else None)
+                    continue
+                for p in due:
+                    del self._pending[p]
+                self._rescan = False
+            try:
+                self._dispatch(due, rescan)
+            except Exception as e:
+                self.log(f"文件变化处理异常: {type(e).__name__}: {e}")
+
+    def _dispatch(self, due, rescan):
+        current = {}
+        for path in due:
+            if self._wanted(os.path.basename(path)):
+                current[path] = _file_signature(path)
+                continue
+            # A directory was created, removed or renamed: check everything below it
+            prefix = path + os.sep
+            for known in self.index:
+                if known.startswith(prefix):
+                    current[known] = None
+            if os.path.isdir(path):
+                current.update(self._scan(path))
+        if rescan:
+            current.update((path, None) for path in self.index)
+            current.update(self._scan(self.root))
+
+        changed = []
+        deleted = []
+        for path in sorted(current):
+            sig = current[path]
+            if sig == self.index.get(path):
+                continue
+            (changed if sig is not None else deleted).append(path)
+        if not changed and not deleted:
+            return
+
+        try:
+            handled = self.on_changes(changed, deleted)
+        except Exception as e:
+            self.log(f"文件变化处理异常: {type(e).__name__}: {e}")
+            handled = True
+        if handled is False:
+            for path in changed + deleted:
+                self._touch(path, delay=self.RETRY_DELAY)
+            return
+        for path in changed:
+            self.index[path] = current[path]
+        for path in deleted:
+            self.index.pop(path, None)
+
+class AutoSyncService:
+    """Keeps the summary workbook in step with a source directory while the program runs.
+
+    The SourceWatcher's index (path -> size/mtime) is built once; one incremental
+    process_source run over the indexed paths then catches up with changes made while
+    auto-sync was off, without walking the tree again. After that every batch of file
+    changes becomes a micro-sync through apply_source_changes that only rewrites the rows
+    of the affected documents. acquire/release let the caller keep micro-syncs from
+    overlapping a manual run; on_synced(changed, deleted, ok) is called after each sync
+    (changed/deleted are None for the catch-up run). Failed syncs are retried after the
+    watcher's RETRY_DELAY.
+    """
+
+    def __init__(self, processor, source_dir, target_excel, on_synced=None, acquire=None, release=None,
+                 batch_delay=3.0, backend=None):
+        self.processor = processor
+        self.source_dir = os.path.normpath(source_dir)
+        self.target_excel = target_excel
+        self.on_synced = on_synced
+        self.acquire = acquire or (lambda: True)
+        self.release = release or (lambda: None)
+        self.watcher = SourceWatcher(
+            self.source_dir, self._on_changes, debounce=batch_delay, log_callback=processor.log, backend=backend
+        )
+        self._caught_up = threading.Event()
+        self._stopped = threading.Event()
+        # Guards _catching_up so stop() cannot miss a catch-up run that is just starting
+        self._lock = threading.Lock()
+        self._catching_up = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self.watcher.start()
+            self._thread = threading.Thread(target=self._catch_up, name="AutoSyncCatchUp", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._lock:
+            self._stopped.set()
+            if self._catching_up:
+                self.processor.stop_requested = True
+        self.watcher.stop()
+
+    def covers(self, path):
+        return _norm_path_key(path).startswith(_norm_path_key(self.source_dir) + os.sep)
+
+    def wait_caught_up(self, timeout=None):
+        return self._caught_up.wait(timeout)
+
+    def _notify(self, changed, deleted, ok):
+        if self.on_synced is None:
+            return
+        try:
+            self.on_synced(changed, deleted, ok)
+        except Exception:
+            pass
+
+    def _catch_up(self):
+        self.watcher.wait_ready()
+        attempt = 0
+        while True:
+            ok = self._catch_up_once(quiet=attempt > 0)
+            if ok is None:
+                return
+            self._notify(None, None, ok)
+            if ok:
+                self._caught_up.set()
+                return
+            # e.g. the workbook is open in Excel; batches wait in the watcher until this succeeds
+            attempt += 1
+            if self._stopped.wait(self.watcher.RETRY_DELAY):
+                return
+
+    def _catch_up_once(self, quiet=False):
+        # Returns None if the service was stopped before the run started
+        acquired = False
+        while not self._stopped.is_set():
+            if self.acquire():
+                acquired = True
+                break
+            self._stopped.wait(1.0)
+        with self._lock:
+            if self._stopped.is_set():
+                if acquired:
+                    self.release()
+                return None
+            self._catching_up = True
+        warning_callback = self.processor.warning_callback
+        if quiet:
+            # The "file is locked" warning was already shown for the first attempt
+            self.processor.warning_callback = None
+        try:
+            return self.processor.process_source(
+                self.source_dir, self.target_excel, overwrite=False, incremental=True,
+                word_files=sorted(self.watcher.index),
+            )
+        except Exception as e:
+            self.processor.log(f"自动同步异常: {type(e).__name__}: {e}")
+            return False
+        finally:
+            self.processor.warning_callback = warning_callback
+            with self._lock:
+                self._catching_up = False
+                if self._stopped.is_set():
+                    # stop() cancelled this run through the shared flag; the next run must not see it
+                    self.processor.stop_requested = False
+            self.release()
+
+    def _on_changes(self, changed, deleted):
+        # Runs on the watcher's dispatcher thread; False has the watcher retry the batch later
+        if self._stopped.is_set():
+            return True
+        if not self._caught_up.is_set() or not self.acquire():
+            return False
+        try:
+            self.processor.log(f"自动同步: {len(changed)} 个文档新增或修改，{len(deleted)} 个文档已删除。")
+            # Re-reading the whole workbook for the sidecar would dwarf a micro-sync
+            ok = self.processor.apply_source_changes(changed, deleted, self.target_excel, refresh_sidecar=False)
+            self.processor.metrics.count("autosync.batches")
+        except Exception as e:
+            self.processor.log(f"自动同步异常: {type(e).__name__}: {e}")
+            ok = False
+        finally:
+            self.release()
+        self._notify(changed, deleted, ok)
+        # A failed batch (locked workbook, document still being written) is retried by the watcher
+        return ok
+
+class DefectProcessor:
+    # Below this many .docx files a process pool costs more to start than it saves
+    PARALLEL_MIN_FILES = 8
+    # process_source saves the workbook after this many files or seconds (not when overwriting)
+    CHECKPOINT_FILES = 200
+    CHECKPOINT_SECONDS = 120
+
+    def __init__(self, log_callback=print, progress_callback=None, workers=None, warning_callback=None, metrics=None):
+        self.log = log_callback
+        self.progress = progress_callback
+        self.metrics = metrics or ProcessorMetrics()
+        # Called as warning_callback(title, message) for problems the user must act on
+        self.warning_callback = warning_callback
+        self.stop_requested = False
+        self.paused = False
+        # "auto": read .docx natively and use Word COM only for .doc; "com": always use Word
+        self.extraction_backend = "auto"
+        # Process count for parallel .docx extraction; None picks one from the CPU count, 1 disables it
+        self.workers = workers
+        # Rows already extracted from unchanged documents are reused from this SQLite file
+        self.use_extraction_cache = True
+        self.extraction_cache_path = None
+        # Refresh the dashboard's columnar copy of the workbook after each save
+        self.write_stats_sidecar = True
+        self.stats_sidecar_dir = None
+        # Record per-file progress of process_source so an interrupted run can resume
+        self.use_job_journal = True
+        self.job_journal_path = None
+        # WordAppPool shared by every Word COM path; created on first use, see close()
+        self.word_pool = None
+        # Per-document changes planned by the last sync_word_from_excel call
+        self.last_writeback_plan = []
+        # Skip documents whose Excel rows and file are unchanged since their last reverse sync
+        self.use_writeback_state = True
+        self.writeback_state_path = None
+
+    def _get_word_pool(self):
+        if self.word_pool is None:
+            self.word_pool = WordAppPool(metrics=self.metrics, log_callback=self.log)
+        return self.word_pool
+
+    def close(self):
+        """Quit the pooled Word instances (they are otherwise kept warm between runs)."""
+        if self.word_pool is not None:
+            self.word_pool.close()
+            self.word_pool = None
+
+    def _is_doc_path_string(self, value):
+        if not isinstance(value, str):
+            return False
+        s = value.strip()
+        if not s:
+            return False
+        if not s.lower().endswith((".doc", ".docx")):
+            return False
+        return (":\\" in s) or ("\\" in s) or ("/" in s)
+
+    def _safe_temp_name(self, name):
+        s = str(name or "")
+        for ch in ['\\', '/', ':', '*', '?', '"', '<', '>', '|', '：']:
+            s = s.replace(ch, "_")
+        s = s.strip()
+        return s or "word.doc"
+
+    def _open_word_doc(self, word, file_path):
+        open_kwargs = dict(
+            ReadOnly=True,
+            AddToRecentFiles=False,
+            ConfirmConversions=False,
+            Visible=False,
+            OpenAndRepair=True,
+        )
+        return word.Documents.Open(file_path, **open_kwargs)
+
+    def _build_row_data(self, cells, file_path):
+        return build_row_data(cells, file_path)
+
+    def _can_extract_natively(self, file_path):
+        if self.extraction_backend == "com":
+            return False
+        return str(file_path).lower().endswith(".docx")
+
+    def _log_extract_warning(self, file_name, warning):
+        if warning == "no_table":
+            self.log(f"  警告: {file_name} 中没有表格")
+        elif warning == "no_rows":
+            self.log(f"  警告: {file_name} 表格行数不足")
+
+    def _read_word_doc(self, word, file_path, file_name=None, temp_dir=None, tmp_name=None):
+        # Runs on a WordAppPool thread; a file Word refuses to open in place is read from a copy in temp_dir
+        file_name = file_name or os.path.basename(file_path)
+        doc = None
+        try:
+            with self.metrics.timed("com.open", file=file_name) as info:
+                try:
+                    doc = self._open_word_doc(word, file_path)
+                except Exception:
+                    if temp_dir is None:
+                        raise
+                    info["fallback_copy"] = True
+                    tmp_path = os.path.join(temp_dir, tmp_name or self._safe_temp_name(file_name))
+                    shutil.copy2(file_path, tmp_path)
+                    doc = self._open_word_doc(word, tmp_path)
+
+            with self.metrics.timed("com.extract", file=file_name) as info:
+                rows = self._extract_doc_rows_com(doc, file_path, file_name)
+                info["rows"] = len(rows or [])
+            return rows
+        finally:
+            if doc is not None:
+                with self.metrics.timed("com.close", file=file_name):
+                    try:
+                        doc.Close(False)
+                    except Exception:
+                        pass
+
+    def _extract_docx_rows(self, file_path, file_name=None):
+        file_name = file_name or os.path.basename(file_path)
+        with self.metrics.timed("extract.native", file=file_name) as info:
+            rows, warning = extract_docx_rows(file_path)
+            info["rows"] = len(rows)
+        self._log_extract_warning(file_name, warning)
+        return rows
+
+    def _load_workbook(self, path, **kwargs):
+        import openpyxl
+        with self.metrics.timed("excel.load", file=os.path.basename(path), read_only=bool(kwargs.get("read_only"))):
+            return openpyxl.load_workbook(path, **kwargs)
+
+    def _save_workbook(self, wb, path):
+        with self.metrics.timed("excel.save", file=os.path.basename(path)) as info:
+            _save_workbook_atomic(wb, path)
+            try:
+                info["bytes"] = os.path.getsize(path)
+            except OSError:
+                pass
+        if "bytes" in info:
+            self.metrics.count("excel.bytes_written", info["bytes"])
+
+    def _resolve_worker_count(self, job_count):
+        workers = self.workers
+        if workers is None:
+            if job_count < self.PARALLEL_MIN_FILES:
+                return 1
+            workers = _default_worker_count()
+        workers = self._coerce_int(workers, 1)
+        return max(1, min(workers, job_count))
+
+    def _open_extraction_cache(self):
+        if not self.use_extraction_cache:
+            return None
+        try:
+            return ExtractionCache(self.extraction_cache_path).open()
+        except Exception as e:
+            self.log(f"提示: 提取缓存不可用（{type(e).__name__}: {e}），将重新读取全部文件。")
+            return None
+
+    def _open_job_journal(self):
+        if not self.use_job_journal:
+            return None
+        try:
+            return JobJournal(self.job_journal_path).open()
+        except Exception as e:
+            self.log(f"提示: 任务记录不可用（{type(e).__name__}: {e}），中断后将无法续传。")
+            return None
+
+    def _open_writeback_state(self):
+        if not self.use_writeback_state:
+            return None
+        try:
+            return WritebackState(self.writeback_state_path).open()
+        except Exception as e:
+            self.log(f"提示: 同步记录不可用（{type(e).__name__}: {e}），将逐个检查所有文档。")
+            return None
+
+    def _remember_extracted_file(self, file_path, rows):
+        cache = self._open_extraction_cache()
+        if cache is None:
+            return
+        try:
+            cache.put(file_path, rows)
+        except Exception:
+            pass
+        finally:
+            cache.close()
+
+    def _iter_file_rows(self, word_files, cache, fingerprints, resumed=None):
+        """Yields (index, rows, source) for every file, in file order.
+
+        rows is None when the file still has to be read through Word; source is "journal"
+        (rows kept by an interrupted run, keyed by normalized path in resumed), "cache"
+        or "native". .docx files are parsed by a process pool that runs a bounded window
+        ahead of the caller, so only that window of results is ever held in memory.
+        Files that miss the cache get their fingerprint recorded in fingerprints.
+        """
+        native = [self._can_extract_natively(p) for p in word_files]
+        workers = self._resolve_worker_count(sum(native))
+        executor = None
+        if workers > 1:
+            try:
+                executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+                self.log(f"并行解析 {sum(native)} 个 .docx 文件（{workers} 个进程）...")
+            except Exception as e:
+                self.log(f"提示: 并行解析不可用（{type(e).__name__}: {e}），改为逐个读取。")
+        window = workers * 4 if executor is not None else 1
+        ahead = {}
+        next_index = 0
+
+        def prepare(j):
+            p = word_files[j]
+            key = _norm_path_key(p)
+            if resumed and key in resumed:
+                return "journal", resumed.pop(key)
+            if cache is not None and key not in fingerprints:
+                try:
+                    state, rows, fingerprint = cache.check(p)
+                except Exception:
+                    pass
+                else:
+                    if state == "unchanged" and rows is not None:
+                        return "cache", rows
+                    fingerprints[key] = fingerprint
+            if executor is not None and native[j]:
+                return "pool", executor.submit(_extract_docx_worker, p)
+            return "inline", None
+
+        try:
+            for i, file_path in enumerate(word_files):
+                # Keep the pool fed but bounded so pause/stop take effect quickly
+                while next_index < len(word_files) and (
+                    next_index <= i or (len(ahead) < window and not self.paused and not self.stop_requested)
+                ):
+                    ahead[next_index] = prepare(next_index)
+                    next_index += 1
+
+                kind, value = ahead.pop(i)
+                file_name = os.path.basename(file_path)
+                if kind in ("journal", "cache"):
+                    yield i, value, kind
+                    continue
+
+                if kind == "pool":
+                    while True:
+                        try:
+                            rows, warning, error, seconds = value.result(timeout=0.2)
+                            break
+                        except concurrent.futures.TimeoutError:
+                            if self.stop_requested:
+                                return
+                        except Exception as e:
+                            self.log(f"提示: 并行解析不可用（{type(e).__name__}: {e}），改为逐个读取。")
+                            for j, entry in list(ahead.items()):
+                                if entry[0] == "pool":
+                                    entry[1].cancel()
+                                    ahead[j] = ("inline", None)
+                            executor.shutdown(wait=False)
+                            executor = None
+                            kind = "inline"
+                            break
+
+                if kind == "pool":
+                    if seconds is not None:
+                        self.metrics.add_time(
+                            "extract.native", seconds, file=file_name, pool=True,
+                            rows=len(rows) if rows is not None else 0,
+                        )
+                    if error is None:
+                        self._log_extract_warning(file_name, warning)
+                        yield i, rows, "native"
+                        continue
+                    self.metrics.event("extract.native_failed", file=file_name, error=error)
+                    self.log(f"  提示: 无法直接解析 {file_name}（{error}），改用 Word 读取")
+                elif native[i]:
+                    try:
+                        rows = self._extract_docx_rows(file_path, file_name)
+                    except Exception as e:
+                        self.log(f"  提示: 无法直接解析 {file_name}（{type(e).__name__}: {e}），改用 Word 读取")
+                    else:
+                        yield i, rows, "native"
+                        continue
+                yield i, None, None
+        finally:
+            if executor is not None:
+                for kind, value in ahead.values():
+                    if kind == "pool":
+                        value.cancel()
+                executor.shutdown(wait=True)
+
+    def _extract_doc_rows_com(self, doc, file_path, file_name=None):
+        file_name = file_name or os.path.basename(file_path)
+        if doc.Tables.Count <= 0:
+            self.log(f"  警告: {file_name} 中没有表格")
+            return []
+        table = doc.Tables(1)
+        row_count = table.Rows.Count
+        if row_count <= 1:
+            self.log(f"  警告: {file_name} 表格行数不足")
+            return []
+        rows = []
+        for cells in self._read_com_table_rows(table, row_count):
+            row_data = self._build_row_data(cells, file_path)
+            if row_data is not None:
+                rows.append(row_data)
+        return rows
+
+    def _read_com_table_rows(self, table, row_count, first_row=2, max_cols=13):
+        # One Range.Text round trip for the whole table; per-cell reads only when merged
+        # cells make the text ambiguous
+        grid = None
+        try:
+            if table.Uniform:
+                grid = split_com_table_text(table.Range.Text, row_count, table.Columns.Count)
+        except Exception:
+            grid = None
+        if grid is not None:
+            self.metrics.count("com.table_bulk")
+            return [cells[:max_cols] for cells in grid[first_row - 1:]]
+
+        self.metrics.count("com.table_per_cell")
+        rows = []
+        for r in range(first_row, row_count + 1):
+            cells = []
+            for c in range(1, max_cols + 1):
+                try:
+                    cells.append(table.Cell(r, c).Range.Text)
+                except Exception:
+                    cells.append("")
+            rows.append(cells)
+        return rows
+
+    def _load_processed_paths_from_excel(self, target_excel):
+        try:
+            wb = self._load_workbook(target_excel, read_only=True, data_only=True)
+            paths = self._processed_paths_ws(wb.active)
+            try:
+                wb.close()
+            except Exception:
+                pass
+        except Exception:
+            return set()
+        return paths
+
+    def _processed_paths_ws(self, ws):
+        paths = set()
+        for row in ws.iter_rows(min_row=4, min_col=14, max_col=14, values_only=True):
+            v = row[0] if row else None
+            if not isinstance(v, str):
+                continue
+            s = v.strip()
+            if not s:
+                continue
+            paths.add(os.path.normcase(os.path.normpath(s)))
+        return paths
+
+    def _row_has_content(self, row_data):
+        if not row_data or len(row_data) <= 1:
+            return False
+        for cell in row_data[1:]:
+            if self._is_doc_path_string(cell):
+                continue
+            if str(cell).strip():
+                return True
+        return False
+
+    def _coerce_int(self, value, default=0):
+        try:
+            if value is None:
+                return default
+            s = str(value).strip()
+            if s == "":
+                return default
+            return int(float(s))
+        except Exception:
+            return default
+
+    def _find_last_valid_row(self, ws, min_row=3, serial_col=1, max_cols=13):
+        for row in range(ws.max_row, min_row - 1, -1):
+            serial_val = ws.cell(row=row, column=serial_col).value
+            if serial_val is None or str(serial_val).strip() == "":
+                continue
+            has_any = False
+            for c in range(2, max_cols + 1):
+                v = ws.cell(row=row, column=c).value
+                if self._is_doc_path_string(v):
+                    continue
+                if v is not None and str(v).strip() != "":
+                    has_any = True
+                    break
+            if has_any:
+                return row
+        return 0
+
+    def _row_has_any_defect_cells(self, ws, row, start_col=2, end_col=13):
+        for c in range(start_col, end_col + 1):
+            v = ws.cell(row=row, column=c).value
+            if v is not None and str(v).strip() != "":
+                return True
+        return False
+
+    def _renumber_rows_ws(self, ws):
+        changed = False
+        serial = 0
+        for row in range(4, ws.max_row + 1):
+            cell = ws.cell(row=row, column=1)
+            if self._row_has_any_defect_cells(ws, row, start_col=2, end_col=13):
+                serial += 1
+                value = serial
+            else:
+                value = None
+            if cell.value != value:
+                cell.value = value
+                changed = True
+        return changed
+
+    def _hide_path_column_ws(self, ws):
+        from openpyxl.utils import get_column_letter
+        try:
+            ws.column_dimensions[get_column_letter(14)].hidden = True
+        except Exception:
+            pass
+
+    def _compact_rows_ws(self, ws, rows_to_delete, min_row=4):
+        # Drops rows in one forward pass. ws.delete_rows shifts every cell below the
+        # deleted row on each call, which is quadratic when many rows go at once.
+        max_row = ws.max_row
+        drop = {r for r in (rows_to_delete or ()) if min_row <= r <= max_row}
+        if not drop:
+            return 0
+
+        new_index = {}
+        dst = min_row
+        for src in range(min_row, max_row + 1):
+            if src in drop:
+                continue
+            new_index[src] = dst
+            dst += 1
+
+        # Cells keep their value, style, comment and hyperlink; only their row changes
+        cells = ws._cells
+        kept = {}
+        for (r, c), cell in cells.items():
+            if r < min_row:
+                kept[(r, c)] = cell
+                continue
+            nr = new_index.get(r)
+            if nr is None:
+                continue
+            cell.row = nr
+            kept[(nr, c)] = cell
+        cells.clear()
+        cells.update(kept)
+
+        dims = ws.row_dimensions
+        old_dims = list(dims.items())
+        dims.clear()
+        for r, dim in old_dims:
+            nr = r if r < min_row else new_index.get(r)
+            if nr is None:
+                continue
+            dim.index = nr
+            dims[nr] = dim
+        return len(drop)
+
+    def _normalize_rows_ws(self, ws):
+        rows_to_delete = []
+        for row in range(ws.max_row, 3, -1):
+            path_val = ws.cell(row=row, column=14).value
+            serial_val = ws.cell(row=row, column=1).value
+            has_defect = self._row_has_any_defect_cells(ws, row, start_col=2, end_col=13)
+            has_path = isinstance(path_val, str) and path_val.strip() != ""
+            has_serial = serial_val is not None and str(serial_val).strip() != ""
+
+            if not has_defect and (has_path or has_serial):
+                rows_to_delete.append(row)
+
+        deleted = self._compact_rows_ws(ws, rows_to_delete)
+        changed = self._renumber_rows_ws(ws)
+        self._hide_path_column_ws(ws)
+        return deleted, changed
+
+    def _normalize_excel_rows(self, target_excel):
+        try:
+            wb = self._load_workbook(target_excel)
+            deleted, _ = self._normalize_rows_ws(wb.active)
+            self._save_workbook(wb, target_excel)
+            return deleted
+        except PermissionError:
+            raise
+        except Exception as e:
+            self.log(f"规范化Excel数据时出错: {e}")
+            return 0
+
+    def _estimate_row_height(self, row_data, base_height=45, max_height=150):
+        data = list(row_data or [])
+        if data:
+            last = data[-1]
+            if isinstance(last, str):
+                s = last.strip()
+                if s and (":\\" in s or "\\" in s or "/" in s) and s.lower().endswith((".doc", ".docx")):
+                    data = data[:-1]
+        max_len = 0
+        for cell_text in data:
+            if cell_text is None:
+                continue
+            max_len = max(max_len, len(str(cell_text)))
+        est_lines = (max_len / 25) + 1
+        height = max(base_height, est_lines * 15)
+        return min(height, max_height)
+
+    def _apply_template_style(self, dst_cell, src_cell):
+        from openpyxl.styles import Alignment
+        try:
+            dst_cell._style = copy(src_cell._style)
+        except Exception:
+            pass
+        try:
+            dst_cell.font = copy(src_cell.font)
+        except Exception:
+            pass
+        try:
+            dst_cell.border = copy(src_cell.border)
+        except Exception:
+            pass
+        try:
+            dst_cell.fill = copy(src_cell.fill)
+        except Exception:
+            pass
+        try:
+            dst_cell.number_format = src_cell.number_format
+        except Exception:
+            pass
+        try:
+            dst_cell.protection = copy(src_cell.protection)
+        except Exception:
+            pass
+        try:
+            base_alignment = copy(src_cell.alignment)
+            try:
+                dst_cell.alignment = base_alignment.copy(wrapText=True)
+            except Exception:
+                dst_cell.alignment = Alignment(horizontal=base_alignment.horizontal, vertical=base_alignment.vertical, wrap_text=True)
+        except Exception:
+            dst_cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+
+    def _template_style_arrays(self, ws, template_cells):
+        # Registers each template column's style (with wrapping on) in the workbook's
+        # style tables once; new cells then only need a copy of the 9 style ids.
+        from openpyxl.styles import Alignment
+        wb = ws.parent
+        styles = []
+        for src_cell in template_cells:
+            style = copy(src_cell._style)
+            try:
+                alignment = copy(src_cell.alignment)
+                alignment.wrap_text = True
+            except Exception:
+                alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+            style.alignmentId = wb._alignments.add(alignment)
+            styles.append(style)
+        return styles
+
+    def _write_rows_to_excel(self, target_excel, extracted_rows, overwrite=False):
+        wb = self._load_workbook(target_excel)
+        wrote = self._write_rows_ws(wb.active, extracted_rows, overwrite=overwrite)
+        self._save_workbook(wb, target_excel)
+        return wrote
+
+    def _write_rows_ws(self, ws, extracted_rows, overwrite=False):
+        if overwrite:
+            template_row = 3 if ws.max_row >= 3 else 1
+            if ws.max_row >= 4:
+                try:
+                    ws.delete_rows(4, ws.max_row - 3)
+                except Exception:
+                    pass
+            last_serial = 0
+            current_row = 4
+        else:
+            last_valid_row = self._find_last_valid_row(ws, min_row=3, serial_col=1, max_cols=14)
+            template_row = last_valid_row if last_valid_row >= 3 else 3
+            last_serial = self._coerce_int(ws.cell(row=last_valid_row, column=1).value) if last_valid_row >= 3 else 0
+            current_row = (last_valid_row if last_valid_row >= 3 else 2) + 1
+
+        template_cells = [ws.cell(row=template_row, column=c) for c in range(1, 14)]
+        template_height = ws.row_dimensions[template_row].height
+        if template_height is None:
+            template_height = 45
+        serial = last_serial
+        try:
+            template_styles = self._template_style_arrays(ws, template_cells)
+        except Exception:
+            template_styles = None
+
+        self._hide_path_column_ws(ws)
+
+        wrote = 0
+        for row_data in extracted_rows:
+            if not self._row_has_content(row_data):
+                continue
+
+            serial += 1
+            if len(row_data) < 14:
+                row_data = list(row_data) + [""] * (14 - len(row_data))
+            row_data = row_data[:14]
+            row_data[0] = str(serial)
+
+            height = self._estimate_row_height(row_data, base_height=template_height)
+            ws.row_dimensions[current_row].height = height
+
+            for col_idx, value in enumerate(row_data, start=1):
+                dst_cell = ws.cell(row=current_row, column=col_idx, value=value)
+                if col_idx <= 13:
+                    if template_styles is not None:
+                        # Each cell needs its own StyleArray (setters mutate it in place)
+                        dst_cell._style = copy(template_styles[col_idx - 1])
+                    else:
+                        self._apply_template_style(dst_cell, template_cells[col_idx - 1])
+
+            wrote += 1
+            current_row += 1
+
+        return wrote
+
+    def _remove_rows_by_paths(self, target_excel, paths_to_remove):
+        if not paths_to_remove:
+            return 0
+        
+        try:
+            wb = self._load_workbook(target_excel)
+            removed = self._remove_rows_by_paths_ws(wb.active, paths_to_remove)
+            if removed:
+                self._save_workbook(wb, target_excel)
+            return removed
+            
+        except Exception as e:
+            self.log(f"清理删除文件数据时出错: {e}")
+            return 0
+
+    def _remove_rows_by_paths_ws(self, ws, paths_to_remove):
+        if not paths_to_remove:
+            return 0
+
+        rows_to_delete = []
+        
+        # Scan all rows to find matches
+        # Data starts at row 4
+        for row in range(ws.max_row, 3, -1):
+            cell_val = ws.cell(row=row, column=14).value
+            if cell_val:
+                s_val = str(cell_val).strip()
+                if s_val:
+                    norm_val = os.path.normcase(os.path.normpath(s_val))
+                    if norm_val in paths_to_remove:
+                        rows_to_delete.append(row)
+        
+        if not rows_to_delete:
+            return 0
+        
+        self.log(f"发现 {len(rows_to_delete)} 条记录对应已删除的文件，正在清理...")
+        
+        self._compact_rows_ws(ws, rows_to_delete)
+            
+        # Re-serialize
+        self._renumber_rows_ws(ws)
+        return len(rows_to_delete)
+
+    def _extract_single_file_com(self, file_path):
+        pool = self._get_word_pool()
+        try:
+            try:
+                return pool.call(lambda word: self._read_word_doc(word, file_path))
+            except Exception as e:
+                if _is_rpc_unavailable(e):
+                    pool.recycle()
+                time.sleep(1)
+                return pool.call(lambda word: self._read_word_doc(word, file_path))
+        except Exception as e:
+            self.log(f"读取Word文件失败: {e}")
+            return None
+
+    def _extract_file_rows(self, file_path):
+        rows = None
+        if self._can_extract_natively(file_path):
+            try:
+                rows = self._extract_docx_rows(file_path)
+            except Exception as e:
+                self.log(f"  提示: 无法直接解析（{type(e).__name__}: {e}），改用 Word 读取")
+                rows = None
+        if rows is None:
+            rows = self._extract_single_file_com(file_path)
+        if rows is not None:
+            self.metrics.count("rows.extracted", len(rows))
+        return rows
+
+    def apply_source_changes(self, changed, deleted, target_excel, refresh_sidecar=True):
+        """Re-extract the changed documents and drop the rows of deleted ones with one workbook save.
+
+        A changed document that cannot be read keeps its current rows. Returns False if any
+        document failed or the workbook could not be written. With refresh_sidecar=False the
+        stats sidecar goes stale and is rebuilt by the next dashboard load.
+        """
+        extracted = {}
+        ok = True
+        for file_path in changed:
+            rows = self._extract_file_rows(file_path)
+            if rows is None:
+                ok = False
+                continue
+            extracted[file_path] = rows
+        if not extracted and not deleted:
+            return ok
+
+        try:
+            with WorkbookSession(self, target_excel) as session:
+                session.remove_paths({_norm_path_key(p) for p in list(extracted) + list(deleted)})
+                rows = [row for file_rows in extracted.values() for row in file_rows]
+                if rows:
+                    session.append_rows(rows, overwrite=False)
+                session.normalize()
+                saved = session.commit()
+            if saved and refresh_sidecar:
+                self._refresh_stats_sidecar(target_excel)
+        except Exception as e:
+            self.log(f"写入Excel失败: {e}")
+            return False
+        for file_path, rows in extracted.items():
+            self._remember_extracted_file(file_path, rows)
+        return ok
+
+    def update_single_file(self, file_path, target_excel):
+        self.log(f"正在更新单个文件: {file_path}")
+        if not os.path.exists(file_path):
+            self.log(f"文件不存在: {file_path}")
+            return False
+        if not self.apply_source_changes([file_path], [], target_excel):
+            return False
+        self.log("单文件更新完成。")
+        return True
+
+    def _apply_writeback(self, doc, changes):
+        # One batch per document: no screen redraw, all edits grouped into a single undo entry
+        word_app = doc.Application
+        table = doc.Tables(1)
+        screen = None
+        undo = None
+        try:
+            try:
+                screen = word_app.ScreenUpdating
+                word_app.ScreenUpdating = False
+            except Exception:
+                screen = None
+            try:
+                undo = word_app.UndoRecord
+                undo.StartCustomRecord("缺陷反向同步")
+            except Exception:
+                undo = None
+
+            applied = 0
+            for table_row, column, _, new_v in changes:
+                try:
+                    table.Cell(table_row, column).Range.Text = new_v
+                    applied += 1
+                except Exception:
+                    pass
+            return applied
+        finally:
+            if undo is not None:
+                try:
+                    undo.EndCustomRecord()
+                except Exception:
+                    pass
+            if screen is not None:
+                try:
+                    word_app.ScreenUpdating = screen
+                except Exception:
+                    pass
+
+    def _log_writeback_plan(self, file_name, changes, limit=20):
+        self.log(f"计划修改 {file_name}: {len(changes)} 处")
+        for table_row, column, old_v, new_v in changes[:limit]:
+            self.log(f"  第{table_row}行第{column}列: {old_v!r} -> {new_v!r}")
+        if len(changes) > limit:
+            self.log(f"  ……其余 {len(changes) - limit} 处省略")
+
+    def sync_word_from_excel(self, target_excel, dry_run=False):
+        self.log("正在读取Excel数据以同步到Word..." if not dry_run else "正在读取Excel数据以预演反向同步（不写入Word）...")
+        norm_cache_start = _normalize_key_text.cache_info()
+        self.last_writeback_plan = []
+
+        def pick_headers(ws):
+            for r in (3, 2, 1):
+                vals = []
+                non_empty = 0
+                for c in range(1, 14):
+                    v = ws.cell(row=r, column=c).value
+                    s = "" if v is None else str(v).strip()
+                    if s:
+                        non_empty += 1
+                    vals.append(s)
+                if non_empty >= 3:
+                    return vals
+            return [""] * 13
+
+        def open_word_doc_editable(word_app, file_path):
+            open_kwargs = dict(
+                ReadOnly=False,
+                AddToRecentFiles=False,
+                ConfirmConversions=False,
+                Visible=False,
+                OpenAndRepair=True,
+            )
+            return word_app.Documents.Open(file_path, **open_kwargs)
+
+        try:
+            wb = self._load_workbook(target_excel, data_only=True)
+            ws = wb.active
+        except Exception as e:
+            self.log(f"无法读取Excel文件: {e}")
+            return False
+
+        headers = pick_headers(ws)
+
+        update_cols = []
+        for i, h in enumerate(headers):
+            if not h:
+                continue
+            if i == 0:
+                continue
+            if any(k in h for k in ["销号", "处理", "原因", "措施", "整改", "备注", "状态", "完成"]):
+                update_cols.append(i)
+
+        update_cols = sorted(set(update_cols))
+        if not update_cols:
+            self.log("未识别到可同步的字段（如“销号时间/处理情况/备注/状态”等），为避免误写，已取消反向同步。")
+            return False
+
+        key_cols = []
+        for i, h in enumerate(headers):
+            if not h:
+                continue
+            if any(k in h for k in ["销号", "处理", "原因", "措施", "整改", "备注", "状态", "完成"]):
+                continue
+            if any(k in h for k in ["描述", "地点", "位置", "类型", "发现", "发生", "时间", "日期", "编号"]):
+                key_cols.append(i)
+
+        key_cols = sorted(set(key_cols))
+        if not key_cols:
+            key_cols = [i for i in range(1, 13) if i not in update_cols][:4]
+
+        base_cols = [i for i in range(1, 13) if i not in update_cols]
+        if not base_cols:
+            base_cols = key_cols[:]
+
+        # Every cell is normalized once; matching then only compares strings
+        norm_cols = sorted(set(key_cols) | set(base_cols) | set(update_cols))
+
+        def normalize_row(values):
+            norm = [""] * 13
+            for idx in norm_cols:
+                try:
+                    norm[idx] = norm_key_part(values[idx])
+                except Exception:
+                    pass
+            return norm
+
+        matcher = RowMatcher(key_cols, base_cols)
+
+        file_rows = {}
+        total_rows = 0
+        for excel_row_idx, row in enumerate(ws.iter_rows(min_row=4, max_col=14, values_only=True), start=4):
+            if not row or len(row) < 14:
+                continue
+
+            path_val = row[13]
+            if not isinstance(path_val, str) or not path_val.strip():
+                continue
+            file_path = os.path.normpath(path_val.strip())
+
+            values = list(row[:13])
+            if len(values) < 13:
+                values.extend([None] * (13 - len(values)))
+            values = values[:13]
+
+            has_any = False
+            for v in values[1:]:
+                if v is None:
+                    continue
+                if str(v).strip() != "":
+                    has_any = True
+                    break
+            if not has_any:
+                continue
+
+            norm = normalize_row(values)
+            primary_key, sig = matcher.row_keys(norm)
+            if not primary_key or not sig:
+                continue
+
+            file_rows.setdefault(file_path, []).append((excel_row_idx, values, norm))
+            total_rows += 1
+
+        if not file_rows:
+            self.log("Excel中没有可用于反向同步的数据记录。")
+            return True
+
+        pool = None
+        state = self._open_writeback_state()
+        try:
+            total_files = len(file_rows)
+            unchanged_files = 0
+            updated_files = 0
+            updated_cells = 0
+            planned_files = 0
+            planned_cells = 0
+            skipped_rows = 0
+            ambiguous_rows = 0
+            unmatched_rows = 0
+
+            def record_plan(file_path, changes, counts):
+                nonlocal planned_files, planned_cells, skipped_rows, ambiguous_rows, unmatched_rows
+                ambiguous_rows += counts["ambiguous"]
+                unmatched_rows += counts["unmatched"]
+                skipped_rows += counts["ambiguous"] + counts["unmatched"]
+                if not changes:
+                    return
+                planned_files += 1
+                planned_cells += len(changes)
+                self.last_writeback_plan.append({"file": file_path, "changes": list(changes)})
+                if dry_run:
+                    self._log_writeback_plan(os.path.basename(file_path), changes)
+
+            def read_native_plan(file_path, rows_data):
+                # .docx tables are diffed from the XML; returns None when Word has to read the file
+                if not self._can_extract_natively(file_path):
+                    return None
+                try:
+                    grid = read_docx_table_rows(file_path)
+                except Exception:
+                    return None
+                if not grid:
+                    return None
+                word_norm = [normalize_row(cells + [""] * (13 - len(cells))) for cells in grid[1:]]
+                return plan_writeback(rows_data, word_norm, matcher, update_cols)
+
+            def update_document(word_app, file_path, rows_data, planned):
+                # Runs on the WordAppPool thread that owns word_app
+                nonlocal updated_files, updated_cells, skipped_rows
+                doc = None
+                try:
+                    try:
+                        doc = self._open_word_doc(word_app, file_path) if dry_run else open_word_doc_editable(word_app, file_path)
+                    except Exception:
+                        time.sleep(0.6)
+                        doc = self._open_word_doc(word_app, file_path) if dry_run else open_word_doc_editable(word_app, file_path)
+
+                    if doc.Tables.Count <= 0:
+                        self.log(f"跳过无表格文件: {file_path}")
+                        skipped_rows += len(rows_data)
+                        return False
+
+                    table = doc.Tables(1)
+                    word_norm = [
+                        normalize_row([clean_word_text(c) for c in cells] + [""] * (13 - len(cells)))
+                        for cells in self._read_com_table_rows(table, table.Rows.Count)
+                    ]
+                    changes, counts = plan_writeback(rows_data, word_norm, matcher, update_cols)
+                    if planned is None:
+                        record_plan(file_path, changes, counts)
+                    elif changes != planned:
+                        self.log(f"提示: {os.path.basename(file_path)} 在Word中读到的表格与预先解析的不一致，已按Word中的内容重新匹配。")
+                    if dry_run or not changes:
+                        return not changes
+
+                    applied = self._apply_writeback(doc, changes)
+                    if applied > 0:
+                        try:
+                            doc.Save()
+                        except Exception as e:
+                            self.log(f"保存失败 {file_path}: {e}")
+                            return False
+                        updated_files += 1
+                        updated_cells += applied
+                    return applied == len(changes)
+
+                except Exception as e:
+                    self.log(f"更新失败 {file_path}: {type(e).__name__}: {e}")
+                finally:
+                    if doc:
+                        try:
+                            doc.Close(False)
+                        except Exception:
+                            try:
+                                doc.Close()
+                            except Exception:
+                                pass
+
+            for i, (file_path, rows_data) in enumerate(file_rows.items(), start=1):
+                if self.stop_requested:
+                    self.log("用户停止了同步。")
+                    break
+
+                file_name = os.path.basename(file_path)
+                if self.progress:
+                    self.progress(i - 1, total_files, f"{'预演' if dry_run else '更新'}: {file_name}")
+
+                if not os.path.exists(file_path):
+                    self.log(f"跳过不存在的文件: {file_path}")
+                    skipped_rows += len(rows_data)
+                    continue
+
+                excel_hash = None
+                if state is not None:
+                    excel_hash = WritebackState.excel_hash(rows_data, key_cols, base_cols, update_cols)
+                    if state.is_current(file_path, excel_hash):
+                        unchanged_files += 1
+                        self.metrics.count("writeback.unchanged_docs")
+                        continue
+
+                plan = read_native_plan(file_path, rows_data)
+                planned = None
+                if plan is not None:
+                    planned, counts = plan
+                    record_plan(file_path, planned, counts)
+                    # Documents with nothing to change are never opened in Word
+                    if not planned:
+                        self.metrics.count("writeback.skipped_docs")
+                        if state is not None and not dry_run:
+                            state.put(file_path, excel_hash)
+                        continue
+                    if dry_run:
+                        continue
+
+                if pool is None:
+                    pool = self._get_word_pool()
+                in_sync = pool.call(lambda word_app: update_document(word_app, file_path, rows_data, planned))
+                if in_sync and state is not None and not dry_run:
+                    # Recorded after Word has saved and closed the file, so size/mtime are final
+                    state.put(file_path, excel_hash)
+
+            if self.progress:
+                self.progress(total_files, total_files, "完成")
+            if unchanged_files:
+                self.log(f"{unchanged_files} 个文档自上次同步后Excel记录和文件均未变化，已跳过。")
+            if dry_run:
+                self.log(f"反向同步预演完成：将更新文件 {planned_files}/{total_files}，单元格 {planned_cells}，跳过记录 {skipped_rows}（无法匹配 {unmatched_rows}，匹配不唯一 {ambiguous_rows}）。未写入任何Word文档。")
+                self._report_norm_cache(norm_cache_start)
+                return True
+            self.log(f"反向同步完成：更新文件 {updated_files}/{total_files}，更新单元格 {updated_cells}，跳过记录 {skipped_rows}（无法匹配 {unmatched_rows}，匹配不唯一 {ambiguous_rows}）。")
+            if updated_cells == 0 and skipped_rows:
+                self.log("提示：未发生任何写入。通常是因为 Excel 行与 Word 行无法稳定匹配（字段差异/重复记录/合并单元格）。建议先保证“地点/类型/描述/发现时间”等定位字段在两边一致。")
+            self._report_norm_cache(norm_cache_start)
+            return True
+
+        except Exception as e:
+            self.log(f"Word服务异常: {type(e).__name__}: {e}")
+            return False
+        finally:
+            if state is not None:
+                state.close()
+
+    def _report_norm_cache(self, start):
+        info = _normalize_key_text.cache_info()
+        hits = info.hits - start.hits
+        misses = info.misses - start.misses
+        self.metrics.count("norm.cache_hits", hits)
+        self.metrics.count("norm.cache_misses", misses)
+        if hits + misses:
+            self.log(f"字段规范化 {hits + misses} 次，缓存命中率 {hits * 100.0 / (hits + misses):.1f}%（缓存 {info.currsize}/{info.maxsize}）。")
+
+    def _report_excel_locked(self, button_text):
+        self.log("错误: 目标Excel文件被占用 (Permission denied)。")
+        if self.warning_callback:
+            self.warning_callback("文件被占用", f"无法写入目标Excel文件。\n\n请检查该文件是否在Excel中打开。\n请关闭文件后再次点击“{button_text}”。")
+
+    def _commit_session(self, session, button_text):
+        try:
+            if session.commit():
+                self._refresh_stats_sidecar(session.path)
+            return True
+        except PermissionError:
+            self._report_excel_locked(button_text)
+            return False
+
+    def _refresh_stats_sidecar(self, target_excel):
+        if not self.write_stats_sidecar:
+            return
+        try:
+            signature = _file_signature(target_excel)
+            StatsSidecarCache(self.stats_sidecar_dir).store(target_excel, read_defect_frame(target_excel), signature)
+        except Exception as e:
+            self.log(f"提示: 更新统计缓存失败（{type(e).__name__}: {e}）")
+
+    def process_source(self, source_path, target_excel, overwrite=False, incremental=False, word_files=None):
+        # word_files: the documents under source_path when the caller already knows them
+        # (e.g. a SourceWatcher index), so the directory is not walked again
+        cache = self._open_extraction_cache()
+        journal = self._open_job_journal()
+        session = WorkbookSession(self, target_excel)
+        try:
+            ok = self._process_source(
+                source_path, target_excel, overwrite, incremental, cache, session, journal, word_files=word_files
+            )
+            if ok and journal is not None:
+                try:
+                    journal.finish()
+                except Exception:
+                    pass
+            return ok
+        finally:
+            session.close()
+            if cache is not None:
+                cache.close()
+            if journal is not None:
+                journal.close()
+
+    def _process_source(self, source_path, target_excel, overwrite, incremental, cache, session, journal=None, word_files=None):
+        self.log(f"开始处理: {source_path}")
+        
+        if not os.path.exists(target_excel):
+            self.log(f"错误: 找不到目标Excel文件: {target_excel}")
+            return False
+
+        # 1. Collect all Word files
+        if word_files is not None:
+            word_files = list(word_files)
+        elif os.path.isfile(source_path):
+             word_files = []
+             if source_path.lower().endswith(('.doc', '.docx')) and not os.path.basename(source_path).startswith('~$'):
+                word_files.append(source_path)
+        elif os.path.isdir(source_path):
+            word_files = []
+            self.log(f"正在扫描文件夹: {source_path}")
+            for root, dirs, files in os.walk(source_path):
+                for file in files:
+                    if file.lower().endswith(('.doc', '.docx')) and not file.startswith('~$'):
+                        word_files.append(os.path.join(root, file))
+        else:
+            self.log(f"错误: 找不到源文件或文件夹: {source_path}")
+            return False
+
+        try:
+            word_files.sort()
+        except Exception:
+            pass
+
+        fingerprints = {}
+        if incremental:
+            try:
+                session.open()
+                session.normalize()
+            except PermissionError:
+                self._report_excel_locked("导入并同步")
+                return False
+            except Exception as e:
+                self.log(f"错误: 无法读取目标Excel文件（{type(e).__name__}: {e}）")
+                return False
+
+            processed = session.processed_paths()
+            if processed:
+                # 1. Handle deleted files
+                current_files_set = {os.path.normcase(os.path.normpath(p)) for p in word_files}
+                deleted_files = processed - current_files_set
+
+                # Documents already in Excel whose content changed since they were read
+                modified_files = set()
+                if cache is not None:
+                    for p in word_files:
+                        key = _norm_path_key(p)
+                        if key not in processed:
+                            continue
+                        try:
+                            state, _, fingerprint = cache.check(p)
+                        except Exception:
+                            continue
+                        if state == "modified":
+                            modified_files.add(key)
+                            fingerprints[key] = fingerprint
+                        elif state == "new":
+                            # Imported before the cache existed: remember its current version
+                            cache.put(p, None, fingerprint)
+                    cache.remove(deleted_files)
+                    cache.commit()
+                
+                if deleted_files:
+                    self.log(f"发现 {len(deleted_files)} 个历史文件已被删除，正在同步清理Excel记录...")
+                    removed_count = session.remove_paths(deleted_files)
+                    self.log(f"已清理 {removed_count} 条无效记录。")
+                    session.normalize()
+
+                if modified_files:
+                    self.log(f"发现 {len(modified_files)} 个Word文档已被修改，正在重新读取...")
+                    session.remove_paths(modified_files)
+                    processed = processed - modified_files
+
+                # 2. Handle new files
+                before = len(word_files)
+                word_files = [p for p in word_files if os.path.normcase(os.path.normpath(p)) not in processed]
+                
+                if not word_files:
+                    if not self._commit_session(session, "导入并同步"):
+                        return False
+                    if deleted_files or modified_files:
+                        self.log("未发现新Word文档，同步完成。")
+                    else:
+                        self.log("未发现新Word文档，无需同步。")
+                    
+                    if self.progress:
+                        self.progress(before, before, "完成")
+                    return True
+            else:
+                self.log("提示: 未能从Excel读取历史路径，将执行全量同步。")
+
+        resumed = {}
+        if journal is not None:
+            try:
+                job_state, entries = journal.begin(
+                    JobJournal.make_key(source_path, target_excel, overwrite, incremental),
+                    _file_signature(target_excel),
+                )
+            except Exception as e:
+                self.log(f"提示: 任务记录不可用（{type(e).__name__}: {e}），中断后将无法续传。")
+                journal = None
+            else:
+                if job_state == "invalidated":
+                    self.log("提示: 目标Excel在上次中断后已被修改，上次的任务记录已作废，将重新处理。")
+                committed = {k for k, (status, _) in entries.items() if status == "committed"}
+                resumed = {k: rows for k, (status, rows) in entries.items() if status == "extracted"}
+                if committed or resumed:
+                    self.log(f"继续上次中断的任务: {len(committed)} 个文件已保存，{len(resumed)} 个文件已读取，无需重新打开。")
+                if committed:
+                    word_files = [p for p in word_files if _norm_path_key(p) not in committed]
+
+        total_files = len(word_files)
+        self.log(f"共发现 {total_files} 个Word文件。")
+        
+        if self.progress:
+            self.progress(0, total_files, "准备开始...")
+
+        if not word_files:
+            return self._commit_session(session, "导入并同步")
+
+        # 2. Extract in file order and write rows to the workbook in checkpoints, so memory
+        # stays flat and an interrupted incremental run resumes after the last saved file
+        checkpointing = not overwrite
+        stream = None
+        batch = []
+        batch_files = 0
+        committed_files = 0
+        last_checkpoint = time.monotonic()
+        state = {"rows": 0, "wrote": 0, "appended": False, "cache_hits": 0}
+
+        def apply_batch():
+            if not batch:
+                return
+            session.open()
+            state["wrote"] += session.append_rows(batch, overwrite=overwrite and not state["appended"])
+            state["appended"] = True
+            self.metrics.count("rows.extracted", len(batch))
+            batch.clear()
+
+        temp_dir_obj = None
+        try:
+            temp_dir_obj = tempfile.TemporaryDirectory()
+            temp_dir = temp_dir_obj.name
+
+            consecutive_rpc_failures = 0
+            stream = self._iter_file_rows(word_files, cache, fingerprints, resumed)
+            done_count = 0
+
+            while True:
+                while getattr(self, "paused", False):
+                    if self.stop_requested:
+                        break
+                    time.sleep(0.1)
+
+                if self.stop_requested:
+                    self.log("用户停止了操作。")
+                    break
+
+                try:
+                    i, rows, source = next(stream)
+                except StopIteration:
+                    break
+
+                file_path = word_files[i]
+                done_count += 1
+                file_name = os.path.basename(file_path)
+                if rows is not None:
+                    if source == "cache":
+                        state["cache_hits"] += 1
+                    elif source != "journal":
+                        self.log(f"已读取 ({done_count}/{total_files}): {file_name}")
+                else:
+                    self.log(f"正在读取 ({done_count}/{total_files}): {file_name}")
+                if self.progress:
+                    self.progress(done_count, total_files, f"读取: {file_name}")
+
+                if rows is None:
+                    pool = self._get_word_pool()
+                    success = False
+                    last_error = None
+
+                    for attempt in range(3):
+                        if attempt:
+                            self.metrics.count("com.retry")
+                        try:
+                            rows = pool.call(lambda word: self._read_word_doc(
+                                word, file_path, file_name, temp_dir, f"{i+1:04d}_{self._safe_temp_name(file_name)}"
+                            ))
+                            success = True
+                            break
+                        except Exception as e:
+                            last_error = e
+                            if _is_rpc_unavailable(e):
+                                self.metrics.event("com.rpc_unavailable", file=file_name, attempt=attempt)
+                                pool.recycle(kill=True)
+                                time.sleep(1.2)
+                                self.metrics.event("word.restart", file=file_name)
+                                consecutive_rpc_failures += 1
+                            else:
+                                consecutive_rpc_failures = 0
+                            time.sleep(0.8)
+
+                    if not success:
+                        self.metrics.event(
+                            "file.failed", file=file_name,
+                            error=f"{type(last_error).__name__}: {last_error}" if last_error is not None else None,
+                        )
+                        if last_error is None:
+                            self.log(f"  错误: 无法读取文件 {file_name}")
+                        else:
+                            if isinstance(last_error, Exception) and "无效的类字符串" in str(last_error):
+                                 self.log(f"  错误: 无法启动 Word 或 WPS。请确认已安装 Microsoft Office 或 WPS Office。")
+                            else:
+                                 self.log(f"  错误: 无法读取文件 {file_name}（{type(last_error).__name__}: {last_error}）")
+
+                        if _is_rpc_unavailable(last_error) or consecutive_rpc_failures >= 2:
+                            isolated_error = None
+                            try:
+                                rows = pool.call(lambda word: self._read_word_doc(
+                                    word, file_path, file_name, temp_dir, f"isolated_{i+1:04d}_{self._safe_temp_name(file_name)}"
+                                ), fresh=True)
+                                self.log(f"  修复: 已通过隔离模式读取 {file_name}")
+                            except Exception as e2:
+                                isolated_error = e2
+
+                            self.metrics.event("com.isolated_fallback", file=file_name, ok=isolated_error is None)
+                            if isolated_error is not None:
+                                self.log(f"  错误: 隔离模式仍失败 {file_name}（{type(isolated_error).__name__}: {isolated_error}）")
+
+                if journal is not None and source != "journal":
+                    try:
+                        journal.record(file_path, "failed" if rows is None else "extracted", rows)
+                    except Exception:
+                        pass
+                if rows is None:
+                    continue
+                key = _norm_path_key(file_path)
+                if cache is not None and key in fingerprints:
+                    try:
+                        cache.put(file_path, rows, fingerprints[key])
+                    except Exception as e:
+                        self.log(f"提示: 写入提取缓存失败（{type(e).__name__}: {e}）")
+                batch.extend(rows)
+                batch_files += 1
+                state["rows"] += len(rows)
+
+                if checkpointing and batch_files and (
+                    batch_files >= self.CHECKPOINT_FILES
+                    or time.monotonic() - last_checkpoint >= self.CHECKPOINT_SECONDS
+                ):
+                    try:
+                        apply_batch()
+                        session.commit()
+                    except PermissionError:
+                        self._report_excel_locked("开始处理")
+                        return False
+                    except Exception as e:
+                        self.log(f"写入Excel失败: {e}")
+                        return False
+                    if cache is not None:
+                        try:
+                            cache.commit()
+                        except Exception:
+                            pass
+                    if journal is not None:
+                        try:
+                            journal.mark_committed(_file_signature(target_excel))
+                        except Exception:
+                            pass
+                    committed_files += batch_files
+                    batch_files = 0
+                    last_checkpoint = time.monotonic()
+                    self.metrics.event("checkpoint", files=committed_files, rows=state["wrote"])
+                    self.log(f"  已保存进度: {committed_files}/{total_files} 个文件")
+        except Exception as e:
+            self.log(f"错误: 读取Word时发生异常（{type(e).__name__}: {e}）")
+            return False
+        finally:
+            try:
+                if stream is not None:
+                    stream.close()
+            except Exception:
+                pass
+            try:
+                if temp_dir_obj:
+                    temp_dir_obj.cleanup()
+            except Exception:
+                pass
+
+        if cache is not None:
+            try:
+                cache.commit()
+            except Exception as e:
+                self.log(f"提示: 写入提取缓存失败（{type(e).__name__}: {e}）")
+        if journal is not None:
+            try:
+                journal.commit()
+            except Exception:
+                pass
+        if state["cache_hits"]:
+            self.log(f"缓存命中 {state['cache_hits']} 个未修改的文件，无需重新读取。")
+
+        if self.stop_requested:
+            if committed_files:
+                self.log(f"已保存 {committed_files} 个文件的记录。")
+            if journal is not None:
+                self.log("已记录处理进度，再次执行相同的处理将从中断处继续。")
+            return False
+
+        if not state["rows"]:
+            self.log("未提取到任何数据。")
+            if self.progress: self.progress(total_files, total_files, "完成")
+            return self._commit_session(session, "开始处理")
+
+        self.log(f"提取完成，共 {state['rows']} 条记录。正在写入Excel...")
+        if self.progress:
+            self.progress(total_files, total_files, "正在写入Excel...")
+
+        # 3. Write the remaining rows and save
+        try:
+            apply_batch()
+            wrote = state["wrote"]
+            session.normalize()
+            session.commit()
+            self._refresh_stats_sidecar(target_excel)
+            if overwrite:
+                self.log(f"写入成功！已刷新 {wrote} 条记录，已保存到: {target_excel}")
+            else:
+                self.log(f"写入成功！新增 {wrote} 条记录，已保存到: {target_excel}")
+            return True
+
+        except PermissionError:
+            self._report_excel_locked("开始处理")
+            return False
+        except Exception as e:
+            self.log(f"写入Excel失败: {e}")
+            return False
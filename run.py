@@ -1,11 +1,64 @@
-import ttkbootstrap as ttk
-from auto_fill_defects import App
+import sys
+import time
+import multiprocessing
+
+_STARTED = time.perf_counter()
+
+
+def _install_import_profiler():
+    # Records the self time of every first-time import, grouped by top-level package
+    import builtins
+    original = builtins.__import__
+    stats = {}
+    child_time = []
+
+    def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+        start = time.perf_counter()
+        child_time.append(0.0)
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = child_time.pop()
+            if child_time:
+                child_time[-1] += elapsed
+            top = name.split(".")[0]
+            stats[top] = stats.get(top, 0.0) + elapsed - nested
+
+    builtins.__import__ = timed_import
+    return stats
+
+
+def _report_startup(stats, marks):
+    now = time.perf_counter()
+    print("启动耗时分析:")
+    for label, t in marks + [("首个窗口就绪", now)]:
+        print(f"  {label:<12} {(t - _STARTED) * 1000:8.1f} ms")
+    print("各模块导入耗时（自身时间，前20项）:")
+    total = sum(stats.values())
+    for name, t in sorted(stats.items(), key=lambda x: x[1], reverse=True)[:20]:
+        print(f"  {name:<24} {t * 1000:8.1f} ms")
+    print(f"  {'合计':<22} {total * 1000:8.1f} ms")
+    sys.stdout.flush()
+
+
+def main(profile_startup=False):
+    stats = _install_import_profiler() if profile_startup else None
+    import ttkbootstrap as ttk
+    from auto_fill_defects import App
+    marks = [("导入完成", time.perf_counter())]
 
-def main(): 
     # Create the main window using ttkbootstrap
     root = ttk.Window(themename="cosmo")
     app = App(root)
+    marks.append(("界面构建完成", time.perf_counter()))
+    if stats is not None:
+        root.after_idle(lambda: _report_startup(stats, marks))
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
+    # Needed by the parallel extraction pool in the frozen (installer) build
+    multiprocessing.freeze_support()
+    main(profile_startup="--profile-startup" in sys.argv[1:])
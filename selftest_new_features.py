@@ -1,11 +1,386 @@
 import os
+import subprocess
+import sys
 import tempfile
+import threading
 import tkinter as tk
+import zipfile
+from xml.sax.saxutils import escape
 
 import openpyxl
 import ttkbootstrap as ttk
 
 import auto_fill_defects as afd
+import defect_processor as dp
+import statistics_panel as sp
+
+
+def _write_test_docx(path, table_rows):
+    ns = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    rows_xml = []
+    for cells in table_rows:
+        tcs = []
+        for text in cells:
+            if text is None:
+                tcs.append("<w:tc><w:tcPr><w:vMerge/></w:tcPr><w:p/></w:tc>")
+                continue
+            paras = "".join(f"<w:p><w:r><w:t>{escape(part)}</w:t></w:r></w:p>" for part in str(text).split("\n"))
+            tcs.append(f"<w:tc>{paras}</w:tc>")
+        rows_xml.append("<w:tr>" + "".join(tcs) + "</w:tr>")
+    body = (
+        '<w:p><w:pPr><w:tabs><w:tab w:val="left" w:pos="720"/></w:tabs></w:pPr><w:r><w:t>标题</w:t></w:r></w:p>'
+        + ("<w:tbl>" + "".join(rows_xml) + "</w:tbl>" if rows_xml else "")
+    )
+    xml = f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document xmlns:w="{ns}"><w:body>{body}</w:body></w:document>'
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("[Content_Types].xml", '<?xml version="1.0"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>')
+        zf.writestr("word/document.xml", xml)
+
+
+def test_com_table_text_split():
+    end = "\r\x07"
+    header = end.join(["序号", "线别", "描述"]) + end + end
+    row = end.join(["1", "", "第一段\r第二段"]) + end + end
+    grid = dp.split_com_table_text(header + row, 2, 3)
+    if grid != [["序号", "线别", "描述"], ["1", "", "第一段\r第二段"]]:
+        raise RuntimeError(f"整表文本拆分错误: {grid}")
+    if dp.DefectProcessor(log_callback=lambda *_: None)._build_row_data(grid[1], "x.doc")[:3] != ["1", "", "第一段第二段"]:
+        raise RuntimeError("整表读取应与逐格读取结果一致")
+
+    # A horizontally merged row has one cell fewer, so the grid no longer fits
+    merged = end.join(["1", "合并"]) + end + end
+    if dp.split_com_table_text(header + merged, 2, 3) is not None:
+        raise RuntimeError("存在合并单元格时应回退到逐格读取")
+    if dp.split_com_table_text("", 1, 3) is not None:
+        raise RuntimeError("空文本应回退到逐格读取")
+
+
+def test_extraction_cache():
+    with tempfile.TemporaryDirectory() as d:
+        docx_path = os.path.join(d, "记录.docx")
+        _write_test_docx(docx_path, [["序号"] * 13, ["1", "广州", "类型A"] + [""] * 10])
+        rows = [["1", "广州", "类型A"] + [""] * 10 + [docx_path]]
+
+        cache = dp.ExtractionCache(os.path.join(d, "cache.sqlite3")).open()
+        try:
+            state, cached, fp = cache.check(docx_path)
+            if state != "new" or cached is not None:
+                raise RuntimeError(f"首次检查状态异常: {state}")
+            cache.put(docx_path, rows, fp)
+
+            state, cached, _ = cache.check(docx_path)
+            if state != "unchanged" or cached != rows:
+                raise RuntimeError(f"未修改文件应命中缓存: {state} {cached}")
+
+            os.utime(docx_path, (0, 0))
+            state, cached, _ = cache.check(docx_path)
+            if state != "unchanged" or cached != rows:
+                raise RuntimeError(f"仅修改时间变化时应按内容哈希命中缓存: {state}")
+
+            _write_test_docx(docx_path, [["序号"] * 13, ["1", "深圳", "类型B"] + [""] * 10])
+            os.utime(docx_path, (1, 1))
+            state, cached, _ = cache.check(docx_path)
+            if state != "modified" or cached is not None:
+                raise RuntimeError(f"内容变化应识别为已修改: {state}")
+        finally:
+            cache.close()
+
+
+def test_job_journal():
+    with tempfile.TemporaryDirectory() as d:
+        docx_path = os.path.join(d, "记录.docx")
+        excel_path = os.path.join(d, "汇总.xlsx")
+        _write_test_docx(docx_path, [["序号"] * 13, ["1", "广州", "类型A"] + [""] * 10])
+        with open(excel_path, "wb") as f:
+            f.write(b"v1")
+        rows = [["1", "广州", "类型A"] + [""] * 10 + [docx_path]]
+        key = dp.JobJournal.make_key(d, excel_path, False, True)
+        journal_path = os.path.join(d, "journal.sqlite3")
+
+        def signature():
+            st = os.stat(excel_path)
+            return (st.st_size, st.st_mtime_ns)
+
+        with dp.JobJournal(journal_path) as journal:
+            state, entries = journal.begin(key, signature())
+            if state != "new" or entries:
+                raise RuntimeError(f"首次任务状态异常: {state}")
+            journal.record(docx_path, "extracted", rows)
+        with dp.JobJournal(journal_path) as journal:
+            state, entries = journal.begin(key, signature())
+            if state != "resumed" or list(entries.values()) != [("extracted", rows)]:
+                raise RuntimeError(f"中断后应能恢复已读取的记录: {state} {entries}")
+            with open(excel_path, "wb") as f:
+                f.write(b"v2 saved")
+            journal.mark_committed(signature())
+        with dp.JobJournal(journal_path) as journal:
+            state, entries = journal.begin(key, signature())
+            if list(entries.values()) != [("committed", None)]:
+                raise RuntimeError(f"保存后应标记为已保存: {entries}")
+            with open(excel_path, "wb") as f:
+                f.write(b"edited elsewhere")
+        with dp.JobJournal(journal_path) as journal:
+            state, entries = journal.begin(key, signature())
+            if state != "invalidated" or entries:
+                raise RuntimeError(f"Excel被修改后任务记录应作废: {state}")
+
+
+def test_word_app_pool():
+    class FakeWord:
+        started = []
+
+        def __init__(self):
+            self.alive = True
+            self.thread = threading.get_ident()
+            FakeWord.started.append(self)
+
+        @property
+        def Version(self):
+            if not self.alive:
+                raise OSError("RPC server unavailable")
+            return "16.0"
+
+        def Quit(self):
+            self.alive = False
+
+    pool = dp.WordAppPool(factory=FakeWord, max_docs=3)
+    try:
+        apps = [pool.call(lambda word: word) for _ in range(4)]
+        if len({id(a) for a in apps[:3]}) != 1 or apps[3] is apps[0] or apps[0].alive:
+            raise RuntimeError("处理3个文档后应更换Word实例")
+        if any(pool.call(lambda word: threading.get_ident()) != a.thread for a in apps):
+            raise RuntimeError("COM对象应只在创建它的线程中使用")
+
+        apps[3].alive = False
+        if pool.call(lambda word: word) is apps[3]:
+            raise RuntimeError("失去响应的Word实例应被替换")
+
+        current = pool.call(lambda word: word)
+        fresh = pool.call(lambda word: word, fresh=True)
+        if fresh is current or fresh.alive or not current.alive:
+            raise RuntimeError("隔离模式应使用并关闭新的Word实例")
+
+        def fail(word):
+            raise ValueError("打开失败")
+        try:
+            pool.call(fail)
+            raise RuntimeError("任务异常应传递给调用方")
+        except ValueError:
+            pass
+        if pool.call(lambda word: word) is not current:
+            raise RuntimeError("普通异常不应导致Word实例被替换")
+    finally:
+        pool.close()
+    if any(a.alive for a in FakeWord.started):
+        raise RuntimeError("关闭后应退出全部Word实例")
+
+
+def test_row_matcher():
+    def row(place, kind, desc, found="2024-03-01", state=""):
+        r = [""] * 13
+        r[1], r[2], r[3], r[4], r[9] = found, place, kind, desc, state
+        return r
+
+    matcher = dp.RowMatcher(key_cols=[1, 2, 3, 4], base_cols=[1, 2, 3, 4, 5, 6])
+    word = [
+        row("广州", "吊弦", "断股"),
+        row("深圳", "绝缘子", "破损"),
+        row("深圳", "绝缘子", "破损", found="2024-03-02"),
+        row("佛山", "支柱", "倾斜"),
+        row("佛山", "支柱", "倾斜"),
+    ]
+    excel = [
+        row("广州", "吊弦", "断股", state="已销号"),
+        row("深圳", "绝缘子", "破损已处理", found="2024-03-02"),
+        row("深圳", "绝缘子", "破损已处理"),
+        row("佛山", "支柱", "倾斜"),
+        row("肇庆", "隔离开关", "卡滞"),
+    ]
+    got = matcher.match(excel, word)
+    expected = [(0, "exact"), (2, "scored"), (1, "scored"), (None, "ambiguous"), (None, "unmatched")]
+    if got != expected:
+        raise RuntimeError(f"行匹配结果错误: {got}")
+
+
+def test_writeback_plan():
+    headers = ["序号", "线别", "发现时间", "设备缺陷地点", "设备缺陷类型", "设备缺陷描述", "发现人",
+               "处理情况", "处理人", "销号时间", "状态", "责任单位", "备注"]
+    record = ["1", "京广线", "2024-03-01", "广州南站", "吊弦", "断股", "张伟", "", "", "", "未销号", "广州供电段", ""]
+    with tempfile.TemporaryDirectory() as d:
+        changed_doc = os.path.join(d, "待更新.docx")
+        same_doc = os.path.join(d, "无变化.docx")
+        _write_test_docx(changed_doc, [headers, record])
+        _write_test_docx(same_doc, [headers, record])
+        before = os.path.getmtime(changed_doc)
+
+        excel_path = os.path.join(d, "汇总.xlsx")
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        for c, h in enumerate(headers, start=1):
+            ws.cell(row=3, column=c, value=h)
+        closed = record[:]
+        closed[9], closed[10] = "2024-03-05", "已销号"
+        for r, (values, path) in enumerate([(closed, changed_doc), (record, same_doc)], start=4):
+            for c, v in enumerate(values + [path], start=1):
+                ws.cell(row=r, column=c, value=v)
+        wb.save(excel_path)
+
+        p = dp.DefectProcessor(log_callback=lambda *_: None)
+        p.writeback_state_path = os.path.join(d, "state.sqlite3")
+        p.stats_sidecar_dir = os.path.join(d, "stats_cache")
+        if not p.sync_word_from_excel(excel_path, dry_run=True):
+            raise RuntimeError("反向同步预演失败")
+        plan = {os.path.basename(x["file"]): x["changes"] for x in p.last_writeback_plan}
+        if plan != {"待更新.docx": [(2, 10, "", "2024-03-05"), (2, 11, "未销号", "已销号")]}:
+            raise RuntimeError(f"写回计划错误: {plan}")
+        if p.word_pool is not None or os.path.getmtime(changed_doc) != before:
+            raise RuntimeError(".docx 的预演不应启动Word或修改文档")
+
+        # A document already in step is remembered and skipped on the next run
+        ws.delete_rows(4)
+        wb.save(excel_path)
+        for _ in range(2):
+            p = dp.DefectProcessor(log_callback=lambda *_: None)
+            p.writeback_state_path = os.path.join(d, "state.sqlite3")
+            p.stats_sidecar_dir = os.path.join(d, "stats_cache")
+            p.sync_word_from_excel(excel_path)
+        if p.metrics.snapshot()["counters"].get("writeback.unchanged_docs") != 1:
+            raise RuntimeError("未变化的文档应在第二次同步时跳过")
+
+
+def test_cli_routing():
+    # CLI subcommands must not start the GUI
+    here = os.path.dirname(os.path.abspath(__file__))
+    for command, option in (("writeback", "--dry-run"), ("watch", "--batch-delay")):
+        result = subprocess.run(
+            [sys.executable, "-m", "auto_fill_defects", command, "--help"],
+            cwd=here, capture_output=True, text=True, encoding="utf-8", timeout=60,
+        )
+        if result.returncode != 0 or option not in result.stdout:
+            raise RuntimeError(f"{command} 子命令未进入命令行模式: {result.returncode} {result.stderr}")
+
+
+def test_source_watcher():
+    with tempfile.TemporaryDirectory() as d:
+        kept = os.path.join(d, "记录.docx")
+        gone = os.path.join(d, "子目录", "旧记录.doc")
+        os.makedirs(os.path.dirname(gone))
+        for path in (kept, gone):
+            with open(path, "w") as f:
+                f.write("1")
+        batches = []
+        done = threading.Event()
+
+        def on_changes(changed, deleted):
+            batches.append((changed, deleted))
+            if sum(len(c) + len(d) for c, d in batches) >= 2:
+                done.set()
+
+        watcher = dp.SourceWatcher(d, on_changes, debounce=0.3, backend="polling")
+        watcher.POLL_INTERVAL = 0.1
+        watcher.start()
+        try:
+            watcher.wait_ready(5)
+            # Several writes in a row (one save) are reported once; Word lock files not at all
+            for _ in range(3):
+                with open(kept, "a") as f:
+                    f.write("x")
+            with open(os.path.join(d, "~$记录.docx"), "w") as f:
+                f.write("lock")
+            os.remove(gone)
+            if not done.wait(5):
+                raise RuntimeError("未检测到文件变化")
+        finally:
+            watcher.stop()
+        changed = [p for c, _ in batches for p in c]
+        deleted = [p for _, d in batches for p in d]
+        if changed != [kept] or deleted != [gone]:
+            raise RuntimeError(f"文件变化合并结果错误: {batches}")
+
+
+def test_auto_sync_service():
+    with tempfile.TemporaryDirectory() as d:
+        src = os.path.join(d, "记录")
+        os.makedirs(src)
+        header = ["序号", "线别", "发现时间", "设备缺陷地点"] + [f"列{i}" for i in range(5, 14)]
+        _write_test_docx(os.path.join(src, "a.docx"), [header, ["1", "京广线", "2024-03-01", "广州南站"] + [""] * 9])
+        excel_path = os.path.join(d, "汇总.xlsx")
+        wb = openpyxl.Workbook()
+        for c, h in enumerate(header, start=1):
+            wb.active.cell(row=3, column=c, value=h)
+        wb.save(excel_path)
+
+        p = dp.DefectProcessor(log_callback=lambda *_: None, workers=1)
+        p.extraction_cache_path = os.path.join(d, "cache.sqlite3")
+        p.job_journal_path = os.path.join(d, "journal.sqlite3")
+        p.write_stats_sidecar = False
+        events = []
+        synced = threading.Condition()
+        locked = threading.Event()
+        save_workbook = p._save_workbook
+
+        def locked_save(wb, path):
+            # Stands in for the workbook being open in Excel
+            if locked.is_set():
+                raise PermissionError(path)
+            save_workbook(wb, path)
+
+        p._save_workbook = locked_save
+
+        def on_synced(changed, deleted, ok):
+            with synced:
+                events.append((changed and sorted(os.path.basename(f) for f in changed), ok))
+                synced.notify_all()
+
+        def wait_event(expected):
+            with synced:
+                if not synced.wait_for(lambda: expected in events, 10):
+                    raise RuntimeError(f"自动同步未产生 {expected}: {events}")
+
+        def excel_docs():
+            ws = openpyxl.load_workbook(excel_path).active
+            return sorted(os.path.basename(r[13]) for r in ws.iter_rows(min_row=4, max_col=14, values_only=True) if r[13])
+
+        service = dp.AutoSyncService(p, src, excel_path, on_synced=on_synced, batch_delay=0.2, backend="polling")
+        service.watcher.POLL_INTERVAL = 0.1
+        service.watcher.RETRY_DELAY = 0.3
+        locked.set()
+        service.start()
+        try:
+            # A locked workbook fails the catch-up, which is retried once the lock is gone
+            wait_event((None, False))
+            locked.clear()
+            if not service.wait_caught_up(20) or excel_docs() != ["a.docx"]:
+                raise RuntimeError("自动同步启动时应导入已有文档")
+            _write_test_docx(os.path.join(src, "b.docx"), [header, ["1", "广深线", "2024-03-02", "深圳北站"] + [""] * 9])
+            wait_event((["b.docx"], True))
+            locked.set()
+            _write_test_docx(os.path.join(src, "c.docx"), [header, ["1", "京沪线", "2024-03-03", "南京南站"] + [""] * 9])
+            wait_event((["c.docx"], False))
+            locked.clear()
+            wait_event((["c.docx"], True))
+        finally:
+            service.stop()
+        if excel_docs() != ["a.docx", "b.docx", "c.docx"]:
+            raise RuntimeError(f"自动同步结果错误: {excel_docs()} {events}")
+
+        # Stopping during the catch-up run cancels it without leaving the processor stopped
+        started = threading.Event()
+
+        def slow_process_source(*args, **kwargs):
+            started.set()
+            while not p.stop_requested:
+                threading.Event().wait(0.01)
+            return False
+
+        p.process_source = slow_process_source
+        service = dp.AutoSyncService(p, src, excel_path, backend="polling").start()
+        if not started.wait(10):
+            raise RuntimeError("自动同步未开始补齐")
+        service.stop()
+        service._thread.join(10)
+        if service._thread.is_alive() or p.stop_requested:
+            raise RuntimeError("停止自动同步后处理器仍处于停止状态")
 
 
 def test_excel_write_rows():
@@ -16,12 +391,14 @@ def test_excel_write_rows():
         ws.cell(row=3, column=1, value="1")
         ws.cell(row=3, column=2, value="模板")
         wb.save(excel_path)
+        os.chmod(excel_path, 0o644)
 
         long_path = os.path.join(d, "a" * 80, "b" * 80, "demo.docx")
         row_data = ["", "广州", "类型A", "地点A", "", "", "", "", "", "", "", "", "", long_path]
         row_data2 = ["", "深圳", "类型B", "地点B", "", "", "", "", "", "", "", "", "", long_path]
 
-        p = afd.DefectProcessor(log_callback=lambda *_: None)
+        p = dp.DefectProcessor(log_callback=lambda *_: None)
+        p.stats_sidecar_dir = os.path.join(d, "stats_cache")
         wrote = p._write_rows_to_excel(excel_path, [row_data])
         if wrote != 1:
             raise RuntimeError(f"写入条数异常: {wrote}")
@@ -29,6 +406,8 @@ def test_excel_write_rows():
         wrote2 = p._write_rows_to_excel(excel_path, [row_data2])
         if wrote2 != 1:
             raise RuntimeError(f"追加写入条数异常: {wrote2}")
+        if os.name != "nt" and os.stat(excel_path).st_mode & 0o777 != 0o644:
+            raise RuntimeError(f"写入后文件权限被改变: {oct(os.stat(excel_path).st_mode & 0o777)}")
 
         wb2 = openpyxl.load_workbook(excel_path)
         ws2 = wb2.active
@@ -79,6 +458,8 @@ def test_undo_redo_pause():
             pass
 
         app = afd.App(root)
+        # The statistics view is only built when first shown
+        app.create_stats_view()
         app.stats_panel.load_data = lambda *args, **kwargs: None
         if not hasattr(app.processor, "paused"):
             raise RuntimeError("DefectProcessor 初始化未包含 paused 字段")
@@ -171,9 +552,9 @@ def test_filtering_year_month_status():
         pass
 
     excel_var = tk.StringVar(value="")
-    panel = afd.StatisticsPanel(root, excel_var, app_instance=None)
+    panel = sp.StatisticsPanel(root, excel_var, app_instance=None)
 
-    df = afd.pd.DataFrame(
+    df = sp.pd.DataFrame(
         {
             "序号": [1, 2, 3, 4],
             "设备缺陷地点": ["A", "B", "C", "D"],
@@ -227,7 +608,77 @@ def test_filtering_year_month_status():
         pass
 
 
+def test_native_docx_extractor():
+    with tempfile.TemporaryDirectory() as d:
+        docx_path = os.path.join(d, "记录.docx")
+        header = ["序号", "线别", "类型"] + [f"列{i}" for i in range(4, 14)]
+        data1 = ["1", "广州", "类型A", "地点A\n第二段"] + [""] * 9
+        data2 = ["2", None, "类型B", "地点B"]
+        empty = ["3"] + [""] * 12
+        _write_test_docx(docx_path, [header, data1, data2, empty])
+
+        raw = dp.read_docx_table_rows(docx_path)
+        if raw is None or len(raw) != 4:
+            raise RuntimeError(f"原始表格行数异常: {raw}")
+
+        p = dp.DefectProcessor(log_callback=lambda *_: None)
+        rows = p._extract_docx_rows(docx_path)
+        if len(rows) != 2:
+            raise RuntimeError(f"提取条数异常: {rows}")
+        for row in rows:
+            if len(row) != 14 or row[-1] != docx_path:
+                raise RuntimeError(f"行结构异常: {row}")
+        if rows[0][3] != "地点A第二段":
+            raise RuntimeError(f"多段落单元格拼接异常: {rows[0][3]!r}")
+        if rows[1][1] != "" or rows[1][3] != "地点B":
+            raise RuntimeError(f"纵向合并单元格处理异常: {rows[1]}")
+
+        no_table = os.path.join(d, "无表格.docx")
+        _write_test_docx(no_table, [])
+        if dp.read_docx_table_rows(no_table) is not None:
+            raise RuntimeError("无表格文档应返回空结果")
+
+
+def test_ngram_index():
+    df = sp.pd.DataFrame(
+        {
+            "序号": [1, 2, 3],
+            "设备缺陷地点": ["甲站", "乙站", "丙站"],
+            "设备缺陷类型": ["接触网", "绝缘子", "接触网"],
+            "设备缺陷描述": ["螺栓松动", "表面破损", "吊弦断股"],
+            "Unnamed: 13": [rf"D:\缺陷记录\2024\{n}.docx" for n in "abc"],
+        }
+    )
+    index = sp.NgramIndex()
+    index.sync(df)
+    # The source-path column is not searchable
+    cases = {"螺栓松动": [0], "接触网": [0, 2], "站": [0, 1, 2], "松动破": [], "乙站绝": [], "docx": [], "记录": []}
+    for query, expected in cases.items():
+        got = sorted(index.search(query, df))
+        if got != expected:
+            raise RuntimeError(f"索引查询“{query}”结果异常: {got}")
+
+    df2 = df.copy()
+    df2.loc[1, "设备缺陷描述"] = "表面锈蚀"
+    index.sync(df2)
+    if index.search("锈蚀", df2) != [1] or index.search("破损", df2) != []:
+        raise RuntimeError("增量同步后索引未更新")
+    if index.search("锈蚀", df) is not None:
+        raise RuntimeError("索引不应回答旧数据的查询")
+
+
 def main():
+    test_native_docx_extractor()
+    test_com_table_text_split()
+    test_extraction_cache()
+    test_job_journal()
+    test_word_app_pool()
+    test_row_matcher()
+    test_writeback_plan()
+    test_cli_routing()
+    test_source_watcher()
+    test_auto_sync_service()
+    test_ngram_index()
     test_excel_write_rows()
     test_undo_redo_pause()
     test_filtering_year_month_status()
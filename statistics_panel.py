@@ -0,0 +1,1351 @@
+import os
+import time
+import threading
+from array import array
+import tkinter as tk
+from tkinter import filedialog, messagebox, LEFT, RIGHT, BOTH, X, Y, YES, VERTICAL, W
+import ttkbootstrap as ttk
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+import datetime
+from defect_processor import (
+    SourceWatcher,
+    StatsSidecarCache,
+    dispatch_word_app,
+    read_defect_frame,
+    _date_candidate_columns,
+    _parse_datetime_series,
+    _file_signature,
+    _norm_path_key,
+)
+
+def _beep():
+    try:
+        import winsound
+        winsound.MessageBeep()
+    except Exception:
+        pass
+
+def _date_column_priority_key(col, non_null_count=0):
+    s = str(col)
+    keywords = ["发现", "发生", "缺陷", "登记", "填报", "上报", "录入", "创建"]
+    kw_idx = next((i for i, kw in enumerate(keywords) if kw in s), len(keywords))
+    exact = [
+        "缺陷时间", "缺陷日期",
+        "发生时间", "发生日期",
+        "发现时间", "发现日期",
+        "登记时间", "登记日期",
+        "填报时间", "填报日期",
+        "上报时间", "上报日期",
+        "录入时间", "录入日期",
+        "创建时间", "创建日期",
+        "日期",
+    ]
+    exact_idx = next((i for i, name in enumerate(exact) if name == s), len(exact))
+    return (-int(non_null_count), exact_idx, kw_idx, s)
+
+def derive_date_columns(df):
+    """Parse the dashboard's date-derived columns once.
+
+    Returns (frame, reference_column). The frame shares df's index and holds
+    ref_dt (reference column parsed), close_dt, filter_dt (discovery dates
+    by priority, falling back to close_dt), year, month and is_closed.
+    """
+    empty = pd.Series([pd.NaT] * len(df), index=df.index, dtype="datetime64[ns]")
+    close_dt = empty
+    if "销号时间" in df.columns:
+        try:
+            close_dt = _parse_datetime_series(df["销号时间"])
+        except Exception:
+            close_dt = empty
+
+    parsed = []
+    for c in _date_candidate_columns(df):
+        dt = _parse_datetime_series(df[c])
+        parsed.append((c, dt, int(dt.notna().sum())))
+    parsed.sort(key=lambda x: _date_column_priority_key(x[0], x[2]))
+
+    ref_col = parsed[0][0] if parsed else None
+    ref_dt = parsed[0][1] if parsed else empty
+    combined = None
+    for _, dt, _ in parsed:
+        combined = dt if combined is None else combined.where(combined.notna(), dt)
+    filter_dt = close_dt if combined is None else combined.where(combined.notna(), close_dt)
+
+    derived = pd.DataFrame(
+        {
+            "ref_dt": ref_dt,
+            "close_dt": close_dt,
+            "filter_dt": filter_dt,
+            "year": filter_dt.dt.year,
+            "month": filter_dt.dt.month,
+            "is_closed": close_dt.notna(),
+        },
+        index=df.index,
+    )
+    return derived, ref_col
+
+def _format_dates(dt):
+    out = dt.dt.strftime('%Y-%m-%d')
+    return out.where(dt.notna(), "-")
+
+def _source_path_text(col):
+    # Stripped string values of col and a mask of those that look like Word document paths
+    col = col.astype(object)
+    is_str = col.map(lambda v: isinstance(v, str)).astype(bool)
+    text = col[is_str].str.strip()
+    lower = text.str.lower()
+    hit = (
+        (text.str.contains("\\", regex=False) | text.str.contains("/", regex=False))
+        & (lower.str.endswith(".doc") | lower.str.endswith(".docx"))
+    )
+    return text, hit
+
+def _find_source_paths(df):
+    paths = pd.Series("", index=df.index, dtype=object)
+    missing = pd.Series(True, index=df.index)
+    for c in reversed(list(df.columns)):
+        col = df[c]
+        if pd.api.types.is_numeric_dtype(col) or pd.api.types.is_datetime64_any_dtype(col):
+            continue
+        text, hit = _source_path_text(col[missing])
+        if text.empty:
+            continue
+        hit_idx = hit[hit].index
+        if len(hit_idx):
+            paths.loc[hit_idx] = text.loc[hit_idx]
+            missing.loc[hit_idx] = False
+            if not missing.any():
+                break
+    return paths
+
+SEARCH_COLUMNS = ["序号", "设备缺陷地点", "设备缺陷类型", "销号时间"]
+
+def _search_text_columns(df):
+    cols = [c for c in SEARCH_COLUMNS if c in df.columns]
+    for c in df.columns:
+        if c in cols:
+            continue
+        col = df[c]
+        if pd.api.types.is_numeric_dtype(col) or pd.api.types.is_datetime64_any_dtype(col):
+            continue
+        # The hidden source-path column would make "docx" or a folder name match every row;
+        # a sample of its values is enough to recognise it
+        text, hit = _source_path_text(col.dropna().head(200))
+        if hit.any() and hit.sum() * 2 >= (text != "").sum():
+            continue
+        cols.append(c)
+    return cols
+
+def build_search_column(df):
+    """Lowercased text of the searchable fields and every other text column except the
+    source document paths, one string per row."""
+    text = pd.Series("", index=df.index, dtype=object)
+    for c in _search_text_columns(df):
+        col = df[c]
+        if pd.api.types.is_datetime64_any_dtype(col):
+            part = col.astype(str).where(col.notna(), "")
+        else:
+            part = col.astype(object).where(col.notna(), "").astype(str)
+        # Unit separator keeps a query from matching across two fields
+        text = text + "\x1f" + part.str.lower()
+    return text
+
+class NgramIndex:
+    """Character unigram/bigram inverted index over build_search_column() text.
+
+    Posting lists hold slot numbers in ascending order; a slot is one row's
+    text. Rows whose text is unchanged across reloads keep their slot, so a
+    re-sync after a single document update only indexes the changed rows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.source = None
+        self._reset()
+
+    def _reset(self):
+        self._postings = {}
+        self._slot_text = []
+        self._slot_label = []
+        self._alive = 0
+
+    @staticmethod
+    def _grams(text):
+        grams = set(text)
+        grams.update(text[i:i + 2] for i in range(len(text) - 1))
+        return grams
+
+    def _add(self, label, text):
+        slot = len(self._slot_text)
+        self._slot_text.append(text)
+        self._slot_label.append(label)
+        self._alive += 1
+        for gram in self._grams(text):
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array("i")
+            posting.append(slot)
+
+    def sync(self, df, texts=None):
+        if texts is None:
+            texts = build_search_column(df)
+        rows = list(zip(df.index, texts.tolist()))
+        with self._lock:
+            free = {}
+            for slot, text in enumerate(self._slot_text):
+                if text is not None:
+                    free.setdefault(text, []).append(slot)
+            pending = []
+            for label, text in rows:
+                slots = free.get(text)
+                if slots:
+                    self._slot_label[slots.pop()] = label
+                else:
+                    pending.append((label, text))
+            for slots in free.values():
+                for slot in slots:
+                    self._slot_text[slot] = None
+                    self._slot_label[slot] = None
+                    self._alive -= 1
+
+            # Rebuild once dead slots outnumber live ones
+            if len(self._slot_text) - self._alive > max(1000, self._alive + len(pending)):
+                self._reset()
+                pending = rows
+            for label, text in pending:
+                self._add(label, text)
+            self.source = df
+
+    def search(self, query, source):
+        """Labels of rows in source whose text contains query, or None if the index can't answer now."""
+        q = (query or "").lower()
+        if not q or "\x1f" in q:
+            return None
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            if self.source is not source:
+                return None
+            grams = {q} if len(q) == 1 else {q[i:i + 2] for i in range(len(q) - 1)}
+            postings = []
+            for gram in grams:
+                posting = self._postings.get(gram)
+                if not posting:
+                    return []
+                postings.append(posting)
+            postings.sort(key=len)
+            slots = np.array(postings[0], dtype=np.intc)
+            for posting in postings[1:]:
+                slots = np.intersect1d(slots, np.array(posting, dtype=np.intc), assume_unique=True)
+                if not len(slots):
+                    return []
+            texts, labels = self._slot_text, self._slot_label
+            if len(q) <= 2:
+                return [labels[i] for i in slots.tolist() if texts[i] is not None]
+            return [labels[i] for i in slots.tolist() if texts[i] is not None and q in texts[i]]
+        finally:
+            self._lock.release()
+
+def build_detail_store(df, derived, reference_col=None):
+    """Pre-format the detail list once: one display tuple, source path and closed flag per row."""
+    n = len(df)
+    if '序号' in df.columns:
+        serial = df['序号'].astype(object)
+    elif len(df.columns) > 0:
+        serial = df.iloc[:, 0].astype(object)
+    else:
+        serial = pd.Series([None] * n, index=df.index, dtype=object)
+    blank = serial.isna() | serial.map(lambda v: str(v).strip() == "" or str(v).strip().lower() == "nan").astype(bool)
+    if blank.any():
+        try:
+            fallback = pd.Series(df.index + 1, index=df.index)
+        except Exception:
+            fallback = pd.Series(range(1, n + 1), index=df.index)
+        serial = serial.where(~blank, fallback)
+
+    def text_col(name):
+        if name in df.columns:
+            return df[name].astype(object).tolist()
+        return [""] * n
+
+    is_closed = derived["is_closed"].tolist()
+    discovery = _format_dates(derived["ref_dt"]) if reference_col else pd.Series("-", index=df.index)
+    status = ["✅ 已销号" if c else "🔴 未销号" for c in is_closed]
+    dates = _format_dates(derived["close_dt"])
+    rows = list(zip(
+        serial.tolist(),
+        discovery.tolist(),
+        text_col('设备缺陷地点'),
+        text_col('设备缺陷类型'),
+        status,
+        dates.tolist(),
+        ["📂 打开"] * n,
+    ))
+    return {
+        "frame": df,
+        "derived": derived,
+        "reference_col": reference_col,
+        "index": df.index,
+        "rows": rows,
+        "paths": _find_source_paths(df).tolist(),
+        "closed": is_closed,
+        "sort_keys": {},
+    }
+
+class StatisticsPanel(ttk.Frame):
+    # Auto-sync batches arriving within this many ms share one dashboard reload
+    SYNC_RELOAD_DELAY_MS = 2000
+
+    def __init__(self, parent, excel_path, app_instance=None):
+        super().__init__(parent)
+        self.excel_path = excel_path
+        self.app = app_instance
+        self.df = None
+        self._loaded_path = None
+        self._loaded_mtime = None
+        self._sidecar = StatsSidecarCache()
+        # Per-frame caches, each a (frame, value) pair so a reader never sees a half-updated one
+        self._derived_cache = None
+        self._search_text_cache = None
+        self._text_index = NgramIndex()
+        self._search_job = None
+        self._search_seq = 0
+        self._resize_job = None
+        self._sync_reload_job = None
+        self._last_canvas_size = None
+        self._redraw_job = None
+        self._redraw_attempts = 0
+        self._redraw_stable = 0
+        self._redraw_last = None
+        self._layout_mode = None
+        self.file_path_map = {}
+        # One SourceWatcher for the source tree re-imports documents opened from the list when saved
+        self._watcher = None
+        self._opened_docs = set()
+        
+        # List View State
+        self.list_data_source = None
+        self.sort_col = None
+        self.sort_reverse = False
+        # Only the visible window of the filtered/sorted order is materialized in the Treeview
+        self._detail_store_cache = None
+        # Normalized source-path keys of self.df, built by the watcher's dispatcher thread only
+        self._source_keys_cache = None
+        self._detail_active_store = None
+        self._detail_order = []
+        self._detail_top = 0
+        self._detail_item_pos = {}
+        self._detail_selected_pos = None
+        self._detail_row_height = 40
+        self._detail_header_height = 30
+        
+        self.setup_ui()
+
+    def setup_ui(self):
+        # --- Top Control Bar (Apple-style Layout) ---
+        # Main Container with increased padding and white background
+        control_bar = ttk.Frame(self, style="Card.TFrame", padding=(20, 15, 20, 15))
+        control_bar.pack(fill=X, pady=(0, 1)) # Small gap below
+
+        # --- Left: Data Actions ---
+        action_group = ttk.Frame(control_bar, style="Card.TFrame")
+        action_group.pack(side=LEFT)
+        
+        self.btn_load = ttk.Button(action_group, text=" 同步数据", command=self.load_data, bootstyle="primary", width=10)
+        self.btn_load.pack(side=LEFT, padx=(0, 10))
+
+        if self.app:
+            self.btn_sync = ttk.Button(action_group, text=" 导入并同步", command=self.on_sync, bootstyle="success", width=12)
+            self.btn_sync.pack(side=LEFT, padx=(0, 10))
+        
+        # Divider
+        ttk.Separator(control_bar, orient=VERTICAL).pack(side=LEFT, fill=Y, padx=20, pady=5)
+
+        # --- Center Left: Filters ---
+        filter_group = ttk.Frame(control_bar, style="Card.TFrame")
+        filter_group.pack(side=LEFT)
+
+        def create_filter(parent, label, variable, values, width, command=None):
+            f_box = ttk.Frame(parent, style="Card.TFrame")
+            f_box.pack(side=LEFT, padx=(0, 15))
+            
+            lbl = ttk.Label(f_box, text=label, font=("Microsoft YaHei UI", 9), foreground="#666666", background="#FFFFFF")
+            lbl.pack(side=LEFT, padx=(0, 8))
+            
+            cb = ttk.Combobox(f_box, textvariable=variable, values=values, width=width, state="readonly", bootstyle="default")
+            cb.pack(side=LEFT)
+            if command:
+                cb.bind("<<ComboboxSelected>>", command)
+            return cb
+
+        self.year_var = tk.StringVar(value="全部")
+        self.year_cb = create_filter(filter_group, "年份", self.year_var, ["全部"], 8, self.apply_filter)
+        
+        self.month_var = tk.StringVar(value="全部")
+        months = ["全部"] + [f"{i}月" for i in range(1, 13)]
+        self.month_cb = create_filter(filter_group, "月份", self.month_var, months, 6, self.apply_filter)
+        
+        self.status_filter_var = tk.StringVar(value="全部状态")
+        self.cb_status = create_filter(filter_group, "状态", self.status_filter_var, ["全部状态", "未销号", "已销号"], 10, lambda e: self.refresh_tree_view())
+
+        # --- Right: Search & Tools ---
+        right_group = ttk.Frame(control_bar, style="Card.TFrame")
+        right_group.pack(side=RIGHT)
+
+        # Export (Far Right)
+        self.btn_export = ttk.Button(right_group, text=" 导出图表", command=self.export_chart, bootstyle="info-outline")
+        self.btn_export.pack(side=RIGHT, padx=(15, 0))
+
+        # Search Box Area
+        search_box = ttk.Frame(right_group, style="Card.TFrame")
+        search_box.pack(side=RIGHT)
+        
+        self.search_var = tk.StringVar()
+        self.entry_search = ttk.Entry(search_box, textvariable=self.search_var, width=20, bootstyle="secondary")
+        self.entry_search.pack(side=LEFT, padx=(0, 5))
+        self.entry_search.bind("<Return>", lambda e: self.refresh_tree_view())
+        self.search_var.trace_add("write", self._on_search_changed)
+        
+        ttk.Button(search_box, text="查询", command=self.refresh_tree_view, bootstyle="secondary-outline", width=6).pack(side=LEFT, padx=(0, 5))
+        ttk.Button(search_box, text="重置", command=self.reset_list_filters, bootstyle="link-secondary").pack(side=LEFT)
+
+        # Status Info (Flexible Spacer)
+        self.lbl_status = ttk.Label(control_bar, text="请先同步数据", bootstyle="secondary", background="#FFFFFF", font=("Microsoft YaHei UI", 8))
+        self.lbl_status.pack(side=LEFT, padx=30)
+
+        # --- Content Area ---
+        self.content_area = ttk.Frame(self)
+        self.content_area.pack(fill=BOTH, expand=YES, pady=0)
+        
+        # View 1: Dashboard
+        self.view_dashboard = ttk.Frame(self.content_area, padding=10) # Add padding for dashboard
+        self.setup_dashboard_tab(self.view_dashboard)
+        
+        # View 2: Detail List
+        self.view_details = ttk.Frame(self.content_area, padding=0)
+        self.setup_details_tab(self.view_details)
+        
+        # Default View
+        self.current_view = None
+        self.switch_view("chart")
+
+    def switch_view(self, view_name):
+        if self.current_view:
+            self.current_view.pack_forget()
+            
+        if view_name == "chart":
+            self.view_dashboard.pack(fill=BOTH, expand=YES)
+            self.current_view = self.view_dashboard
+            self.request_redraw()
+        elif view_name == "list":
+            self.view_details.pack(fill=BOTH, expand=YES)
+            self.current_view = self.view_details
+
+    def setup_dashboard_tab(self, parent):
+        # Summary Cards (Top)
+        self.cards_frame = ttk.Frame(parent)
+        self.cards_frame.pack(fill=X, pady=5)
+        
+        self.card_total = self.create_card(self.cards_frame, "缺陷总数", "0", "info")
+        self.card_open = self.create_card(self.cards_frame, "未销号", "0", "danger")
+        self.card_closed = self.create_card(self.cards_frame, "已销号", "0", "success")
+        
+        # Charts Area (Middle)
+        self.charts_frame = ttk.Frame(parent)
+        self.charts_frame.pack(fill=BOTH, expand=YES, pady=5)
+        
+        self.fig = Figure(figsize=(10, 5), dpi=100, constrained_layout=True)
+        self.fig.patch.set_facecolor('#F8F9FA') # Match light theme bg roughly
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.charts_frame)
+        self.canvas_widget = self.canvas.get_tk_widget()
+        self.canvas_widget.pack(fill=BOTH, expand=YES)
+        self.canvas_widget.bind("<Configure>", self.on_resize, add="+")
+        self.after(0, self._sync_figure_dpi_to_tk)
+
+    def setup_details_tab(self, parent):
+        # --- Treeview ---
+        # Increase row height for better readability
+        style = ttk.Style()
+        for style_name in ("Treeview", "primary.Treeview"):
+            try:
+                style.configure(style_name, rowheight=40)
+            except Exception:
+                pass
+
+        columns = ("serial", "discovery_date", "location", "type", "status", "date", "action")
+        self.tree = ttk.Treeview(parent, columns=columns, show="headings", bootstyle="primary")
+        
+        self.tree.heading("serial", text="序号", command=lambda: self.on_sort_column("serial"))
+        self.tree.heading("discovery_date", text="缺陷发现时间", command=lambda: self.on_sort_column("discovery_date"))
+        self.tree.heading("location", text="设备缺陷地点", command=lambda: self.on_sort_column("location"))
+        self.tree.heading("type", text="设备缺陷类型", command=lambda: self.on_sort_column("type"))
+        self.tree.heading("status", text="状态", command=lambda: self.on_sort_column("status"))
+        self.tree.heading("date", text="销号时间", command=lambda: self.on_sort_column("date"))
+        self.tree.heading("action", text="操作")
+        
+        self.tree.column("serial", width=60, anchor="center")
+        self.tree.column("discovery_date", width=150, anchor="center")
+        self.tree.column("location", width=250, anchor="center")
+        self.tree.column("type", width=150, anchor="center")
+        self.tree.column("status", width=100, anchor="center")
+        self.tree.column("date", width=150, anchor="center")
+        self.tree.column("action", width=100, anchor="center")
+        
+        self.tree.tag_configure("open", foreground="red")
+        self.tree.tag_configure("closed", foreground="green")
+
+        # Scrollbar drives the virtual window, not the Treeview itself
+        self._detail_vsb = ttk.Scrollbar(parent, orient="vertical", command=self._on_detail_scroll, bootstyle="round")
+        
+        self.tree.pack(side=LEFT, fill=BOTH, expand=YES)
+        self._detail_vsb.pack(side=RIGHT, fill=Y)
+        
+        self.tree.bind("<Double-1>", self.on_tree_double_click)
+        self.tree.bind("<Configure>", lambda e: self._render_detail_window())
+        self.tree.bind("<<TreeviewSelect>>", self._on_detail_select)
+
+        # Optimize Mouse Wheel Scrolling
+        def _on_mousewheel(event):
+            try:
+                # Windows: event.delta is usually 120/-120
+                # Accelerate scrolling speed (factor of 3)
+                delta = int(-1 * (event.delta / 120) * 3)
+                self._scroll_detail_rows(delta)
+            except Exception:
+                pass
+            return "break"
+
+        self.tree.bind("<MouseWheel>", _on_mousewheel)
+        
+        # Tooltip or instructions removed as per user request
+
+
+    def on_sync(self):
+        if self.app:
+            self.app.run_sync_process_from_stats()
+
+    def on_resize(self, event):
+        self._last_canvas_size = (event.width, event.height)
+        if self._resize_job is not None:
+            try:
+                self.after_cancel(self._resize_job)
+            except Exception:
+                pass
+        self._resize_job = self.after(120, self._on_resize_debounced)
+
+    def _get_tk_dpi(self):
+        try:
+            dpi = float(self.canvas_widget.winfo_fpixels('1i'))
+            if dpi > 0:
+                return dpi
+        except Exception:
+            pass
+        return float(self.fig.dpi)
+
+    def _sync_figure_dpi_to_tk(self):
+        try:
+            dpi = float(self._get_tk_dpi())
+        except Exception:
+            return
+        if dpi <= 0:
+            return
+        try:
+            current = float(self.fig.dpi)
+        except Exception:
+            current = dpi
+        if abs(current - dpi) < 0.5:
+            return
+        try:
+            self.fig.set_dpi(dpi)
+        except Exception:
+            return
+
+    def _layout_mode_for_width(self, width):
+        try:
+            w = int(width)
+        except Exception:
+            w = 0
+        if w > 1 and w < 800:
+            return "vertical"
+        return "horizontal"
+
+    def _on_resize_debounced(self):
+        self._resize_job = None
+        self._sync_figure_dpi_to_tk()
+        try:
+            w = int(self.canvas_widget.winfo_width())
+        except Exception:
+            w = 0
+        if w <= 1 and self._last_canvas_size:
+            w = int(self._last_canvas_size[0])
+        new_mode = self._layout_mode_for_width(w)
+        if self.df is not None and new_mode != self._layout_mode:
+            self.render_charts()
+            return
+        try:
+            self.canvas.draw_idle()
+        except Exception:
+            pass
+
+    def request_redraw(self):
+        if self._redraw_job is not None:
+            try:
+                self.after_cancel(self._redraw_job)
+            except Exception:
+                pass
+        self._redraw_attempts = 0
+        self._redraw_stable = 0
+        self._redraw_last = None
+        self._redraw_job = self.after(0, self._redraw_tick)
+
+    def _redraw_tick(self):
+        self._redraw_job = None
+        self._redraw_attempts += 1
+        try:
+            self.update_idletasks()
+            w = int(self.canvas_widget.winfo_width())
+            h = int(self.canvas_widget.winfo_height())
+        except Exception:
+            return
+
+        if w < 60 or h < 60:
+            if self._redraw_attempts < 15:
+                self._redraw_job = self.after(60, self._redraw_tick)
+            return
+
+        if self._redraw_last == (w, h):
+            self._redraw_stable += 1
+        else:
+            self._redraw_last = (w, h)
+            self._redraw_stable = 0
+
+        if self._redraw_stable >= 2 or self._redraw_attempts >= 15:
+            try:
+                self._sync_figure_dpi_to_tk()
+                new_mode = self._layout_mode_for_width(w)
+                if self.df is not None and new_mode != self._layout_mode:
+                    self.render_charts()
+                    return
+                self.canvas.draw_idle()
+            except Exception:
+                return
+            return
+
+        self._redraw_job = self.after(80, self._redraw_tick)
+
+    def create_card(self, parent, title, value, bootstyle="primary"):
+        frame = ttk.Frame(parent, bootstyle="light", padding=10)
+        # Use expand=YES to distribute width evenly
+        frame.pack(side=LEFT, fill=BOTH, expand=YES, padx=5)
+        
+        # Use a localized style for the card content
+        ttk.Label(frame, text=title, font=("Microsoft YaHei UI", 10), bootstyle="secondary").pack(anchor=W)
+        lbl = ttk.Label(frame, text=value, font=("Microsoft YaHei UI", 24, "bold"), bootstyle=bootstyle)
+        lbl.pack(pady=5)
+        return lbl
+
+    def load_data(self, force=False, silent=False):
+        path = self.excel_path.get()
+        if not os.path.exists(path):
+            if not silent:
+                messagebox.showerror("错误", "找不到Excel文件")
+            return
+
+        try:
+            try:
+                mtime = os.path.getmtime(path)
+            except Exception:
+                mtime = None
+            if not force and self.df is not None and self._loaded_path == path and self._loaded_mtime == mtime:
+                self.lbl_status.config(text=f"数据已就绪: {time.strftime('%H:%M:%S')}")
+                self.request_redraw()
+                if not silent:
+                    _beep()
+                    messagebox.showinfo("提示", "数据无需更新，已是最新状态。")
+                return
+
+            signature = _file_signature(path)
+            df = self._sidecar.load(path)
+            if df is None:
+                df = read_defect_frame(path)
+                self._sidecar.store(path, df, signature)
+            
+            self.df = df
+            self._loaded_path = path
+            self._loaded_mtime = mtime
+            self._derived_columns(df)
+            self._start_text_index_sync(df)
+            
+            self._refresh_year_options(self.df)
+            
+            self.update_dashboard(self.df)
+            self.lbl_status.config(text=f"数据已更新: {time.strftime('%H:%M:%S')}")
+            self.btn_export.config(state="normal")
+            self.request_redraw()
+            
+            if not silent:
+                _beep()
+                messagebox.showinfo("提示", "数据加载成功！")
+            
+        except PermissionError:
+            if not silent:
+                messagebox.showwarning("提示", "请关闭Excel文件后再读取")
+        except Exception as e:
+            if not silent:
+                messagebox.showerror("错误", str(e))
+
+    def apply_filter(self, event=None):
+        if self.df is None:
+            return
+
+        filtered_df = self.filter_dataframe(
+            self.df,
+            apply_date_filters=True,
+            apply_status_filter=False,
+            apply_search_filter=False,
+        )
+        self.update_dashboard(filtered_df)
+        self.request_redraw()
+
+    def _is_view_of_df(self, df, base=None):
+        if base is None:
+            base = self.df
+        return base is not None and (df is base or bool(df.index.isin(base.index).all()))
+
+    def _frame_cache(self, name, base, build, built=None):
+        """build(base), kept in self.<name> as a (base, value) pair.
+
+        The search worker passes a dict as built: it reads the panel's caches but puts what it
+        had to build into built, which _deliver_search installs on the Tk thread.
+        """
+        if built is not None and name in built:
+            return built[name][1]
+        entry = getattr(self, name)
+        if entry is not None and entry[0] is base:
+            return entry[1]
+        value = build(base)
+        if built is None:
+            setattr(self, name, (base, value))
+        else:
+            built[name] = (base, value)
+        return value
+
+    def _start_text_index_sync(self, df):
+        texts = self._search_column(df)
+        threading.Thread(target=self._text_index.sync, args=(df, texts), daemon=True).start()
+
+    def _derived_columns(self, df, base=None, built=None):
+        """Date-derived columns for df, computed once per self.df and sliced for its subsets."""
+        if base is None:
+            base = self.df
+        if self._is_view_of_df(df, base):
+            derived, ref_col = self._frame_cache("_derived_cache", base, derive_date_columns, built)
+            if df is base:
+                return derived, ref_col
+            return derived.loc[df.index], ref_col
+        return derive_date_columns(df)
+
+    def _get_closed_mask(self, df):
+        if df is None or df.empty:
+            return pd.Series([], dtype=bool)
+        return self._derived_columns(df)[0]["is_closed"]
+
+    def _get_date_candidate_columns(self, df):
+        return _date_candidate_columns(df)
+
+    def _parse_datetime_series(self, series):
+        return _parse_datetime_series(series)
+
+    def _date_column_priority_key(self, col, non_null_count=0):
+        return _date_column_priority_key(col, non_null_count)
+
+    def _refresh_year_options(self, df):
+        filter_dt = self._get_filter_datetime(df)
+        years = (
+            filter_dt.dt.year.dropna()
+            .unique()
+            .astype(int)
+            .tolist()
+        )
+        years = sorted(set(years))
+        values = ["全部"] + [str(y) for y in years]
+        self.year_cb["values"] = values
+        current = (self.year_var.get() or "").strip()
+        if not current or current not in values:
+            self.year_var.set("全部")
+
+    def _choose_reference_date_column(self, df):
+        if df is None or df.empty:
+            return None
+        if not hasattr(df, "columns"):
+            return None
+        return self._derived_columns(df)[1]
+
+    def _get_filter_datetime(self, df):
+        if df is None or df.empty:
+            return pd.Series([], dtype="datetime64[ns]")
+        return self._derived_columns(df)[0]["filter_dt"]
+
+    def filter_dataframe(
+        self,
+        df,
+        apply_date_filters=True,
+        apply_status_filter=True,
+        apply_search_filter=True,
+    ):
+        return self._filter_frame(
+            df,
+            year=(self.year_var.get() or "").strip() if apply_date_filters else None,
+            month_str=(self.month_var.get() or "").strip() if apply_date_filters else None,
+            status=(self.status_filter_var.get() or "").strip() if apply_status_filter else None,
+            query=(self.search_var.get() or "").strip() if apply_search_filter else None,
+        )
+
+    def _filter_frame(self, df, year=None, month_str=None, status=None, query=None, base=None, built=None):
+        # Reads no Tk variables so the search worker thread can call it
+        if df is None or df.empty:
+            return df
+        if base is None:
+            base = self.df
+
+        derived = self._derived_columns(df, base, built)[0]
+        keep = pd.Series(True, index=df.index)
+
+        if year and year != "全部":
+            try:
+                keep &= derived["year"] == int(year)
+            except Exception:
+                pass
+
+        if month_str and month_str != "全部":
+            try:
+                keep &= derived["month"] == int(month_str.replace("月", ""))
+            except Exception:
+                pass
+
+        if status == "未销号":
+            keep &= ~derived["is_closed"]
+        elif status == "已销号":
+            keep &= derived["is_closed"]
+
+        if query:
+            labels = self._text_index.search(query, base) if self._is_view_of_df(df, base) else None
+            if labels is not None:
+                keep &= df.index.isin(labels)
+            else:
+                # Index still building (or df is not self.df): fall back to a linear scan
+                keep &= self._search_column(df, base, built).str.contains(query.lower(), na=False, regex=False)
+
+        return df[keep]
+
+    def _search_column(self, df, base=None, built=None):
+        """build_search_column() for df, built once per self.df."""
+        if base is None:
+            base = self.df
+        if self._is_view_of_df(df, base):
+            texts = self._frame_cache("_search_text_cache", base, build_search_column, built)
+            if df is base:
+                return texts
+            return texts.loc[df.index]
+        return build_search_column(df)
+
+    def update_dashboard(self, df):
+        # 1. Update Cards
+        total = len(df)
+        closed = int(self._get_closed_mask(df).sum()) if total else 0
+        pending = total - closed
+        
+        self.card_total.config(text=str(total))
+        self.card_open.config(text=str(pending))
+        self.card_closed.config(text=str(closed))
+        
+        # 2. Update Charts
+        self.render_charts(df)
+        
+        # 3. Update Detail List
+        self.update_detail_list(df)
+
+    def update_detail_list(self, df):
+        self.list_data_source = df
+        self.refresh_tree_view()
+
+    def reset_list_filters(self):
+        self.search_var.set("")
+        self.status_filter_var.set("全部状态")
+        self.sort_col = None
+        self.sort_reverse = False
+        # Reset headers
+        for c in ["serial", "discovery_date", "location", "type", "status", "date"]:
+            self.tree.heading(c, text=self.tree.heading(c, "text").replace(" ▲", "").replace(" ▼", ""))
+        self.refresh_tree_view()
+
+    def on_sort_column(self, col):
+        if self.sort_col == col:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_col = col
+            self.sort_reverse = False
+            
+        # Update heading indicators
+        for c in ["serial", "discovery_date", "location", "type", "status", "date"]:
+            text = self.tree.heading(c, "text").replace(" ▲", "").replace(" ▼", "")
+            if c == self.sort_col:
+                text += " ▼" if self.sort_reverse else " ▲"
+            self.tree.heading(c, text=text)
+            
+        self.refresh_tree_view()
+
+    def _detail_store_for(self, df, base=None, built=None):
+        if base is None:
+            base = self.df
+        if self._is_view_of_df(df, base):
+            return self._frame_cache(
+                "_detail_store_cache",
+                base,
+                lambda b: build_detail_store(b, *self._derived_columns(b, b, built)),
+                built,
+            )
+        derived, ref_col = self._derived_columns(df, base, built)
+        return build_detail_store(df, derived, ref_col)
+
+    def _detail_sort_key(self, store, sort_col, built=None):
+        keys = store["sort_keys"]
+        if sort_col in keys:
+            return keys[sort_col]
+        if built is not None:
+            for cached_store, col, key in built.get("sort_keys", []):
+                if cached_store is store and col == sort_col:
+                    return key
+        df = store["frame"]
+        derived = store["derived"]
+        key = None
+        if sort_col == "serial":
+            if '序号' in df.columns:
+                key = pd.to_numeric(df['序号'], errors='coerce')
+            else:
+                key = pd.Series(df.index, index=df.index)
+        elif sort_col == "status":
+            key = derived['is_closed']
+        elif sort_col == "discovery_date":
+            key = derived['ref_dt'] if store["reference_col"] else None
+        elif sort_col == "date":
+            key = derived['close_dt']
+        elif sort_col == "location" and '设备缺陷地点' in df.columns:
+            key = df['设备缺陷地点']
+        elif sort_col == "type" and '设备缺陷类型' in df.columns:
+            key = df['设备缺陷类型']
+        if built is None:
+            keys[sort_col] = key
+        else:
+            built.setdefault("sort_keys", []).append((store, sort_col, key))
+        return key
+
+    def _compute_detail_order(self, source, status, query, sort_col, sort_reverse, base=None, built=None):
+        if source is None or source.empty:
+            return None, []
+        df = self._filter_frame(source, status=status, query=query, base=base, built=built)
+        if df is None or df.empty:
+            return None, []
+        store = self._detail_store_for(source, base, built)
+        index = df.index
+
+        # Sorting only reorders positions into the pre-formatted store
+        key = self._detail_sort_key(store, sort_col, built) if sort_col else None
+        if key is not None:
+            ascending = not sort_reverse
+            try:
+                index = key.loc[index].sort_values(ascending=ascending, na_position='last', kind='stable').index
+            except TypeError:
+                index = key.loc[index].astype(str).sort_values(ascending=ascending, kind='stable').index
+        return store, store["index"].get_indexer(index)
+
+    def _detail_query(self):
+        return (
+            self.list_data_source,
+            (self.status_filter_var.get() or "").strip(),
+            (self.search_var.get() or "").strip(),
+            self.sort_col,
+            self.sort_reverse,
+        )
+
+    def refresh_tree_view(self):
+        # Invalidate any search still running so its result is dropped
+        self._search_seq += 1
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+            self._search_job = None
+        store, order = self._compute_detail_order(*self._detail_query())
+        self._show_detail_order(store, order)
+
+    def _show_detail_order(self, store, order):
+        self._detail_active_store = store
+        self._detail_order = order
+        self._detail_top = 0
+        self._detail_selected_pos = None
+        self._render_detail_window()
+
+    def _on_search_changed(self, *args):
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(250, self._start_search)
+
+    def _start_search(self):
+        self._search_job = None
+        self._search_seq += 1
+        seq = self._search_seq
+        params = self._detail_query()
+        base = self.df
+
+        def task():
+            # Works on the frame captured above and never writes the panel's caches
+            built = {}
+            try:
+                store, order = self._compute_detail_order(*params, base=base, built=built)
+            except Exception:
+                return
+            self.after(0, self._deliver_search, seq, base, built, store, order)
+
+        threading.Thread(target=task, daemon=True).start()
+
+    def _deliver_search(self, seq, base, built, store, order):
+        # Results of a search started before a newer search or a data reload are dropped
+        if seq != self._search_seq or base is not self.df:
+            return
+        for name, entry in built.items():
+            if name == "sort_keys":
+                for cached_store, col, key in entry:
+                    cached_store["sort_keys"].setdefault(col, key)
+            else:
+                setattr(self, name, entry)
+        self._show_detail_order(store, order)
+
+    def _detail_capacity(self):
+        try:
+            height = self.tree.winfo_height()
+        except Exception:
+            height = 0
+        if height <= 1:
+            return 30
+        return max(1, (height - self._detail_header_height) // max(1, self._detail_row_height))
+
+    def _render_detail_window(self):
+        store = self._detail_active_store
+        order = self._detail_order if store is not None else []
+        total = len(order)
+        capacity = self._detail_capacity()
+        top = max(0, min(self._detail_top, total - capacity))
+        self._detail_top = top
+        window = order[top:top + capacity]
+
+        items = list(self.tree.get_children())
+        if len(items) > len(window):
+            self.tree.delete(*items[len(window):])
+            del items[len(window):]
+        while len(items) < len(window):
+            items.append(self.tree.insert("", "end"))
+
+        self.file_path_map.clear()
+        self._detail_item_pos = {}
+        selected = []
+        for item_id, pos in zip(items, window):
+            pos = int(pos)
+            self.tree.item(item_id, values=store["rows"][pos], tags=("closed",) if store["closed"][pos] else ("open",))
+            path = store["paths"][pos]
+            if path:
+                self.file_path_map[item_id] = path
+            self._detail_item_pos[item_id] = pos
+            if pos == self._detail_selected_pos:
+                selected.append(item_id)
+        self.tree.selection_set(selected)
+
+        if total:
+            self._detail_vsb.set(top / total, (top + len(window)) / total)
+        else:
+            self._detail_vsb.set(0.0, 1.0)
+
+        if items:
+            try:
+                bbox = self.tree.bbox(items[0])
+                if bbox:
+                    self._detail_header_height, self._detail_row_height = bbox[1], bbox[3]
+            except Exception:
+                pass
+
+    def _scroll_detail_rows(self, delta):
+        self._detail_top += int(delta)
+        self._render_detail_window()
+
+    def _on_detail_scroll(self, *args):
+        if not args:
+            return
+        try:
+            if args[0] == "moveto":
+                self._detail_top = int(float(args[1]) * len(self._detail_order))
+            elif args[0] == "scroll":
+                step = self._detail_capacity() if args[2] == "pages" else 1
+                self._detail_top += int(args[1]) * step
+            else:
+                return
+        except Exception:
+            return
+        self._render_detail_window()
+
+    def _on_detail_select(self, event=None):
+        sel = self.tree.selection()
+        if sel:
+            self._detail_selected_pos = self._detail_item_pos.get(sel[0])
+
+    def on_tree_double_click(self, event):
+        item_id = self.tree.identify_row(event.y)
+        if not item_id:
+            return
+            
+        path = self.file_path_map.get(item_id)
+        if path and os.path.exists(path):
+            self._monitor_word_file(path)
+        else:
+            messagebox.showwarning("提示", "该条记录未关联到Word文档路径（可能是历史数据）。\n建议点击“同步数据”后再试。")
+
+    def _monitor_word_file(self, path):
+        self._opened_docs.add(_norm_path_key(path))
+        auto_sync = getattr(self.app, "auto_sync", None) if self.app else None
+        if auto_sync is None or not auto_sync.covers(path):
+            self._ensure_source_watcher(path)
+
+        def task():
+            try:
+                # COM is only loaded when a document is actually opened
+                import pythoncom
+                import win32com.client
+
+                pythoncom.CoInitialize()
+                # The user edits this document, so attach to their Word rather than a pooled hidden one
+                word = dispatch_word_app(win32com.client.Dispatch)
+                
+                word.Visible = True
+                try:
+                    word.WindowState = 1  # wdWindowStateMaximize
+                    word.Activate()
+                except Exception:
+                    pass
+                word.Documents.Open(path)
+            except Exception as e:
+                self.after(0, lambda msg=str(e): messagebox.showerror("错误", f"打开文件失败: {msg}"))
+            finally:
+                try:
+                    pythoncom.CoUninitialize()
+                except Exception:
+                    pass
+                
+        threading.Thread(target=task, daemon=True).start()
+
+    def _watch_root_for(self, path):
+        src = ""
+        try:
+            if self.app and hasattr(self.app, "entry_src"):
+                src = os.path.normpath(self.app.entry_src.get())
+        except Exception:
+            src = ""
+        doc_dir = os.path.dirname(os.path.normpath(path))
+        if src and os.path.isdir(src) and _norm_path_key(doc_dir + os.sep).startswith(_norm_path_key(src) + os.sep):
+            return src
+        return doc_dir
+
+    def _ensure_source_watcher(self, path):
+        root = self._watch_root_for(path)
+        if self._watcher is not None:
+            if _norm_path_key(self._watcher.root) == _norm_path_key(root):
+                return
+            self._watcher.stop()
+        log = self.app.log_message if self.app and hasattr(self.app, "log_message") else None
+        self._watcher = SourceWatcher(root, self._on_source_changes, log_callback=log).start()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def on_source_synced(self, changed=None, deleted=None, ok=True):
+        # Called on the Tk thread after an auto-sync batch. A hidden dashboard is reloaded by
+        # show_view when it is opened; a visible one reloads once the batches die down.
+        if not ok or not self.winfo_ismapped():
+            return
+        if self._sync_reload_job is not None:
+            self.after_cancel(self._sync_reload_job)
+        self._sync_reload_job = self.after(self.SYNC_RELOAD_DELAY_MS, self._reload_after_sync)
+
+    def _reload_after_sync(self):
+        self._sync_reload_job = None
+        self.load_data(silent=True)
+
+    def _source_keys_for(self, base):
+        # The detail store already holds the paths when the list has been shown
+        entry = self._detail_store_cache
+        paths = entry[1]["paths"] if entry is not None and entry[0] is base else _find_source_paths(base).tolist()
+        return frozenset(_norm_path_key(p) for p in set(paths) if p)
+
+    def _known_source_keys(self):
+        base = self.df
+        if base is None:
+            return frozenset()
+        return self._frame_cache("_source_keys_cache", base, self._source_keys_for)
+
+    def _on_source_changes(self, changed, deleted):
+        # Runs on the watcher's dispatcher thread; only documents already in the summary are refreshed
+        if not (self.app and hasattr(self.app, 'processor')):
+            return True
+        known = self._known_source_keys()
+        paths = []
+        for path in changed:
+            key = _norm_path_key(path)
+            if key in known or key in self._opened_docs:
+                paths.append(path)
+        if not paths:
+            return True
+
+        lock = getattr(self.app, "_processing_lock", None)
+        if lock is not None:
+            with lock:
+                if self.app._is_processing:
+                    return False
+                self.app._is_processing = True
+        try:
+            names = "、".join(os.path.basename(p) for p in paths[:3]) + (f" 等 {len(paths)} 个文档" if len(paths) > 3 else "")
+            self.app.log_message(f"检测到文档保存: {names}，正在更新数据...")
+            success = self.app.processor.apply_source_changes(paths, [], self.excel_path.get())
+        finally:
+            if lock is not None:
+                with lock:
+                    self.app._is_processing = False
+        if success:
+            self.app.log_message("文档变化已同步到汇总表。")
+            self.after(0, lambda: self.load_data(force=True, silent=True))
+        else:
+            self.after(0, lambda: messagebox.showerror("自动同步失败", "无法更新数据，请检查日志。"))
+        return True
+
+    def render_charts(self, df=None):
+        if df is None:
+            df = self.df
+        if df is None:
+            return
+
+        try:
+            self.update_idletasks()
+        except Exception:
+            pass
+
+        self.fig.clear()
+        self.fig.set_constrained_layout(True)
+        
+        # Check Theme for Colors
+        current_theme = ttk.Style().theme_use()
+        is_dark = "dark" in current_theme
+        text_color = '#FFFFFF' if is_dark else '#333333'
+        bg_color = '#222222' if is_dark else '#F8F9FA'
+        grid_color = '#555555' if is_dark else '#DDDDDD'
+        
+        self.fig.patch.set_facecolor(bg_color)
+        
+        # Set Global Font & Colors
+        plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'Arial Unicode MS']
+        plt.rcParams['axes.unicode_minus'] = False
+        plt.rcParams['text.color'] = text_color
+        plt.rcParams['axes.labelcolor'] = text_color
+        plt.rcParams['xtick.color'] = text_color
+        plt.rcParams['ytick.color'] = text_color
+        plt.rcParams['axes.edgecolor'] = grid_color
+        
+        # Layout: Responsive GridSpec
+        from matplotlib.gridspec import GridSpec
+        
+        # Check current width to decide layout
+        try:
+            current_width = int(self.canvas_widget.winfo_width())
+        except Exception:
+            current_width = 0
+        if current_width <= 1 and self._last_canvas_size:
+            current_width = int(self._last_canvas_size[0])
+        self._layout_mode = self._layout_mode_for_width(current_width)
+        if self._layout_mode == "vertical":
+            # Vertical Stack (Small Screen)
+            gs = GridSpec(2, 1, figure=self.fig, hspace=0.4)
+            ax1 = self.fig.add_subplot(gs[0, 0])
+            ax2 = self.fig.add_subplot(gs[1, 0])
+        else:
+            # Horizontal (Large Screen)
+            gs = GridSpec(1, 3, figure=self.fig, wspace=0.3)
+            ax1 = self.fig.add_subplot(gs[0, :2])
+            ax2 = self.fig.add_subplot(gs[0, 2])
+
+        ax1.set_facecolor(bg_color)
+        
+        type_counts = df['设备缺陷类型'].value_counts()
+        type_counts = type_counts[type_counts > 0].head(8) # Show more items since we have space
+        if not type_counts.empty:
+            # Apple Style Colors: System Blue
+            bars = ax1.bar(type_counts.index.astype(str), type_counts.values, color='#007AFF', width=0.6, alpha=0.9)
+            ax1.set_title("缺陷类型分布 (Top 8)", fontsize=12, pad=15, color=text_color, fontweight='bold')
+            ax1.tick_params(axis='x', rotation=30, labelsize=9)
+            ax1.grid(axis='y', linestyle='--', alpha=0.5, color=grid_color)
+            
+            # Remove top and right spines for cleaner look
+            ax1.spines['top'].set_visible(False)
+            ax1.spines['right'].set_visible(False)
+            
+            # Add value labels
+            for bar in bars:
+                height = bar.get_height()
+                ax1.text(bar.get_x() + bar.get_width()/2., height,
+                        f'{int(height)}',
+                        ha='center', va='bottom', color=text_color, fontsize=9)
+        else:
+            ax1.text(0.5, 0.5, "暂无分类数据", ha='center', va='center', color=text_color, fontsize=12)
+            ax1.axis('off')
+            
+        total = len(df)
+        closed = df['销号时间'].notna().sum()
+        pending = total - closed
+        
+        if total > 0:
+            # Apple Style Colors: Green and Red/Orange
+            colors = ['#34C759', '#FF3B30'] # iOS Green, iOS Red
+            wedges, texts, autotexts = ax2.pie([closed, pending], labels=['已销号', '未销号'], 
+                                             autopct='%1.1f%%', colors=colors,
+                                             startangle=90, pctdistance=0.85,
+                                             textprops={'color': text_color, 'fontsize': 10},
+                                             wedgeprops={'width': 0.4, 'edgecolor': bg_color}) # Donut style
+            
+            # Center text
+            ax2.text(0, 0, f"{int((closed/total)*100)}%", ha='center', va='center', fontsize=14, fontweight='bold', color=text_color)
+            ax2.set_title("销号完成率", fontsize=12, pad=15, color=text_color, fontweight='bold')
+        else:
+            ax2.text(0.5, 0.5, "暂无数据", ha='center', va='center', color=text_color, fontsize=12)
+            ax2.axis('off')
+
+        self._sync_figure_dpi_to_tk()
+        try:
+            self.canvas.draw_idle()
+        except Exception:
+            self.canvas.draw_idle()
+
+    def export_chart(self):
+        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        default_filename = f"设备缺陷统计图表_{timestamp}.png"
+        
+        filename = filedialog.asksaveasfilename(
+            initialfile=default_filename,
+            defaultextension=".png", 
+            filetypes=[("PNG Image", "*.png"), ("PDF Document", "*.pdf")]
+        )
+        
+        if filename:
+            try:
+                self.fig.savefig(filename)
+                messagebox.showinfo("成功", f"图表已保存至: {filename}")
+            except Exception as e:
+                messagebox.showerror("错误", f"保存失败: {e}")